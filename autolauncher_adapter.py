@@ -1,9 +1,19 @@
-import os, json, time, shlex
+import os, json, time, shlex, logging, threading
 from typing import List
 from plugin_state import PluginState
-from runner import LocalRunner, HPCRunner
+from log_spool import LogSpool
+from runner import LocalRunner, HPCRunner, TRANSPORT_ERRORS
+from circuit import TargetUnavailable
+from submitter import Submitter, PENDING_SUBMIT, SUBMITTING, SUBMIT_FAILED
+from pilot import PilotPool, PilotExecutor
+from image_cache import ImagePuller
+import volumes
 from utils import gen_podjid
 
+log = logging.getLogger("autolauncher")
+
+TERMINAL_PHASES = ("Succeeded", "Failed")
+
 class AutolauncherAdapter:
     """
     Bridges InterLink plugin API to Autolauncher actions.
@@ -11,10 +21,35 @@ class AutolauncherAdapter:
       - local mode (docker)
       - hpc mode (ssh+slurm) -> stub hooks provided
     Mode can be forced by env: PLUGIN_MODE=local|hpc
+
+    /create only records the pod as Pending-Submit (the durable outbox lives in
+    PluginState); the actual launch runs in the Submitter worker pool.
+
+    HPC pods annotated 'interlink.autolauncher/executor: pilot' are packed into
+    pilot allocations (see pilot.PilotExecutor) instead of one sbatch each.
     """
-    def __init__(self, state: PluginState):
+    def __init__(self, state: PluginState, spool: LogSpool | None = None, pilots: PilotPool | None = None,
+                 images: ImagePuller | None = None):
         self.state = state
+        self.spool = spool or LogSpool()
+        self.pilots = pilots or PilotPool()
+        self.images = images or ImagePuller()
         self.mode_env = os.getenv("PLUGIN_MODE", "").lower().strip()
+        self.submitter = Submitter(state, self._submit, cancel_fn=self._cancel)
+        # seconds between background status refreshes feeding /watch (0 disables)
+        self.refresh_interval = float(os.getenv("PLUGIN_STATUS_REFRESH", "30"))
+
+    def start(self):
+        """
+        Start the submission workers (re-queueing submissions interrupted by a
+        restart), the background status refresher and, for local mode, the
+        pre-pull of the configured images.
+        """
+        self.submitter.start()
+        if self.mode_env in ("", "local"):
+            self.images.prefetch_configured()
+        if self.refresh_interval > 0:
+            threading.Thread(target=self._refresh_loop, name="status-refresh", daemon=True).start()
 
     def _mode_for(self, annotations: dict | None) -> str:
         ann = annotations or {}
@@ -29,6 +64,18 @@ class AutolauncherAdapter:
         target = (ann.get("interlink.autolauncher/target") or "").lower() or "local"
         return target
 
+    @staticmethod
+    def _executor_for(annotations: dict | None) -> str:
+        ann = annotations or {}
+        executor = (ann.get("interlink.autolauncher/executor") or "").lower()
+        return "pilot" if executor == "pilot" else "sbatch"
+
+    def _pilot(self, info: dict) -> PilotExecutor | None:
+        """PilotExecutor for records run by a pilot, None for plain sbatch/local ones."""
+        if info["mode"] == "local" or info.get("executor") != "pilot":
+            return None
+        return PilotExecutor(HPCRunner(target=info.get("target","local")), self.pilots)
+
     @staticmethod
     def _normalize_command_args(command, args) -> tuple[list[str], list[str]]:
         """
@@ -71,63 +118,85 @@ class AutolauncherAdapter:
             image       = container.image
             cmd_list, arg_list = self._normalize_command_args(container.command, container.args)
 
-            # already created?
             if self.state.exists(uid):
-                info = self.state.get(uid)
-                results.append({"PodUID": uid, "PodJID": info.get("jid","")})
+                results.append({"PodUID": uid, "PodJID": (self.state.get(uid) or {}).get("jid", "")})
                 continue
+            # ConfigMaps/Secrets are written locally now, so the outbox record stays small and durable
+            pod_volumes = volumes.materialize(uid, pod, p.container)
 
-            # dispatch by mode
-            if mode == "local":
-                runner = LocalRunner()
-                jid = runner.launch(
-                    uid=uid,
-                    namespace=namespace,
-                    image=image,
-                    command=cmd_list,
-                    args=arg_list,
-                )
-                started_at = time.time()
-                self.state.upsert(uid, {
-                    "name"          : meta.name or uid,
-                    "namespace"     : namespace,
-                    "mode"          : "local",
-                    "target"        : target,
-                    "image"         : image,
-                    "jid"           : jid,
-                    "created_at"    : started_at,
-                    "status"        : "Running",
-                    "container_name": container.name,
-                    "log_cursor"    : 0,
-                })
+            record = {
+                "name"          : meta.name or uid,
+                "namespace"     : namespace,
+                "mode"          : mode,
+                "executor"      : self._executor_for(annotations),
+                "target"        : target,
+                "image"         : image,
+                "jid"           : "",
+                "created_at"    : time.time(),
+                "status"        : PENDING_SUBMIT,
+                "container_name": container.name,
+                "log_cursor"    : 0,
+                "attempts"      : 0,
+                "submit"        : {"command": cmd_list, "args": arg_list, "annotations": annotations,
+                                   "volumes": pod_volumes},
+            }
+            # insert-if-absent keyed by UID: retried /create calls never submit twice
+            if self.state.insert(uid, record):
+                if mode == "local":
+                    # start pulling now; the submitter's launch joins this pull
+                    self.images.prefetch(image)
+                self.submitter.enqueue(uid)
+                jid = ""
             else:
-                runner = HPCRunner(target=target)
-                jid = runner.launch_hpc(
-                    uid=uid, namespace=namespace, image=image,
-                    command=cmd_list, args=arg_list, annotations=annotations,
-                )
-                self.state.upsert(uid, {
-                    "name": meta.name or uid,
-                    "namespace": namespace,
-                    "mode": "hpc",
-                    "target": target,
-                    "image": image,
-                    "jid": jid,
-                    "created_at": time.time(),
-                    "status": "Pending",
-                    "container_name": container.name,
-                    "log_cursor": 0,
-                })
+                jid = (self.state.get(uid) or {}).get("jid", "")
 
             results.append({"PodUID": uid, "PodJID": jid})
         return results
 
+    def _submit(self, uid: str, info: dict) -> tuple[str, str]:
+        """Launch one outbox record. Idempotent per UID (runners look up an existing job first)."""
+        sub = info["submit"]
+        if info["mode"] == "local":
+            self.images.touch(info["image"])
+            self.images.ensure(info["image"])
+            jid = LocalRunner().launch(
+                uid=uid,
+                namespace=info["namespace"],
+                image=info["image"],
+                command=sub["command"],
+                args=sub["args"],
+                binds=volumes.docker_binds(uid, sub.get("volumes") or []),
+            )
+            return jid, "Running"
+        pilot = self._pilot(info)
+        if pilot:
+            jid = pilot.launch(
+                uid=uid, image=info["image"],
+                command=sub["command"], args=sub["args"], annotations=sub["annotations"],
+                volumes=sub.get("volumes"),
+            )
+            return jid, "Pending"
+        jid = HPCRunner(target=info["target"]).launch_hpc(
+            uid=uid, namespace=info["namespace"], image=info["image"],
+            command=sub["command"], args=sub["args"], annotations=sub["annotations"],
+            volumes=sub.get("volumes"),
+        )
+        return jid, "Pending"
+
+    def _cancel(self, uid: str, info: dict):
+        pilot = self._pilot(info)
+        if info["mode"] == "local":
+            LocalRunner().delete(info["jid"])
+        elif pilot:
+            pilot.delete(uid)
+        else:
+            HPCRunner(target=info.get("target","local")).delete_hpc(info["jid"], uid=uid)
+
     # ---------- /status ----------
     def status(self, pods: List) -> List[dict]:
         out = []
         for pod in pods:
             meta = pod.metadata
-            spec = pod.spec
             uid = meta.uid or ""
             namespace = meta.namespace or "default"
             info = self.state.get(uid) if uid else None
@@ -136,54 +205,192 @@ class AutolauncherAdapter:
                 # ...?
                 raise RuntimeError("No container found for UID")
 
+            s, stale = self._observe(uid, info)
+            out.append(self._pod_status(uid, info, s, namespace, stale))
+        return out
+
+    @staticmethod
+    def _submit_phase(info: dict) -> dict | None:
+        """Status of a record still in the submission outbox, else None."""
+        if info.get("status") not in (PENDING_SUBMIT, SUBMITTING, SUBMIT_FAILED):
+            return None
+        if info["status"] == SUBMIT_FAILED:
+            # out of attempts: terminal, like the failed /create it replaces
+            return {"phase": "Failed", "reason": "SubmitFailed", "message": info.get("submit_error"), "exitCode": 1}
+        return {"phase": "Pending", "reason": "PendingSubmit", "message": info.get("submit_error")}
+
+    def _observe(self, uid: str, info: dict) -> tuple[dict, bool]:
+        """
+        Ask the backend for the status of uid. Phase transitions are written to
+        the state (which feeds /watch); returns (status, stale).
+        """
+        s = self._submit_phase(info)
+        if s:
+            return s, False
+
+        if info["mode"] == "local":
+            s = LocalRunner().status(info["jid"])
+            runner = None
+        else:
+            runner = HPCRunner(target=info.get("target","local"))
+            pilot = self._pilot(info)
+            try:
+                s = pilot.status(uid) if pilot else runner.status_hpc(info["jid"])
+            except (TargetUnavailable, *TRANSPORT_ERRORS) as e:
+                # login node down: serve the last known status, flagged as stale
+                log.warning("Status for %s served from cache: %s", uid, e)
+                return info.get("last_status") or {"phase": "Pending", "reason": "TargetUnavailable"}, True
+        self._apply(uid, info, s, runner)
+        return s, False
+
+    def _apply(self, uid: str, info: dict, s: dict, runner: HPCRunner | None):
+        """Record an observed status: phase transitions go to the state, terminal HPC logs to the spool."""
+        def record(r: dict) -> dict | None:
+            if s["phase"] == (r.get("last_status") or {}).get("phase"):
+                return None
+            r["last_status"] = s
+            return r
+
+        # read-modify-write: info may be stale, and a pod deleted meanwhile must stay deleted
+        self.state.update(uid, record)
+        if runner and s["phase"] in TERMINAL_PHASES and not info.get("logs_mirrored") and self.state.exists(uid):
+            self._mirror_logs(uid, info, runner)
+
+    def cached_status(self, uid: str) -> dict | None:
+        """Last recorded status of uid without contacting any backend; None if unknown."""
+        info = self.state.get(uid)
+        if not info:
+            return None
+        s = self._submit_phase(info) or info.get("last_status") or {"phase": "Pending"}
+        return self._pod_status(uid, info, s, info.get("namespace", "default"), False)
+
+    def refresh(self):
+        """
+        Re-observe every pod that is not terminal yet, so /watch sees transitions.
+        HPC pods are batched per target: one session, one squeue/sacct query for
+        all sbatch jobs and one scan per pilot.
+        """
+        by_target: dict[str, dict[str, dict]] = {}
+        for uid, info in self.state.all().items():
+            if self._submit_phase(info) or not info.get("jid") \
+                    or (info.get("last_status") or {}).get("phase") in TERMINAL_PHASES:
+                continue
             if info["mode"] == "local":
-                runner = LocalRunner()
-                s = runner.status(info["jid"])
+                try:
+                    self._observe(uid, info)
+                except Exception:
+                    log.warning("Status refresh failed for %s", uid, exc_info=True)
             else:
-                runner = HPCRunner(target=info.get("target","local"))
-                s = runner.status_hpc(info["jid"])
-
-            # map to InterLink schema
-            if s["phase"] == "Running":
-                cs = {
-                    "name": info["container_name"],
-                    "state": {"terminated": None, "waiting": None,
-                              "running": {"startedAt": s.get("startedAt")}}
-                }
-            elif s["phase"] == "Succeeded":
-                cs = {
-                    "name": info["container_name"],
-                    "state": {"running": None, "waiting": None,
-                              "terminated": {"exitCode": 0, "reason": "Completed"}}
-                }
-            else:
-                cs = {
-                    "name": info["container_name"],
-                    "state": {"running": None, "terminated": None,
-                              "waiting": {"reason": s.get("reason","Pending"), "message": None}}
-                }
-
-            out.append({
-                "name": info["name"],
-                "UID": uid,
-                "JID": info.get("jid"),
-                "namespace": namespace,
-                "containers": [cs],
-            })
-        return out
+                by_target.setdefault(info.get("target", "local"), {})[uid] = info
+
+        for target, pods in by_target.items():
+            try:
+                self._refresh_target(target, pods)
+            except (TargetUnavailable, *TRANSPORT_ERRORS) as e:
+                log.warning("Status refresh of target '%s' skipped: %s", target, e)
+            except Exception:
+                log.warning("Status refresh of target '%s' failed", target, exc_info=True)
+
+    def _refresh_target(self, target: str, pods: dict[str, dict]):
+        runner = HPCRunner(target=target)
+        pilots = PilotExecutor(runner, self.pilots)
+        sbatch = {uid: info for uid, info in pods.items() if info.get("executor") != "pilot"}
+        pilot_uids = [uid for uid, info in pods.items() if info.get("executor") == "pilot"]
+        with runner._session() as c:
+            by_jid = runner.status_many(c, sorted({info["jid"] for info in sbatch.values()}))
+            by_uid = pilots.status_many(c, pilot_uids) if pilot_uids else {}
+        for uid, info in pods.items():
+            s = by_jid.get(info["jid"]) if uid in sbatch else by_uid.get(uid)
+            if s:   # None: the scheduler did not answer for it; try again next pass
+                try:
+                    self._apply(uid, info, s, runner)
+                except Exception:
+                    log.warning("Status refresh failed for %s", uid, exc_info=True)
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            self.refresh()
+
+    @staticmethod
+    def _pod_status(uid: str, info: dict, s: dict, namespace: str, stale: bool) -> dict:
+        # map to InterLink schema
+        if s["phase"] == "Running":
+            cs = {
+                "name": info["container_name"],
+                "state": {"terminated": None, "waiting": None,
+                          "running": {"startedAt": s.get("startedAt")}}
+            }
+        elif s["phase"] == "Succeeded":
+            cs = {
+                "name": info["container_name"],
+                "state": {"running": None, "waiting": None,
+                          "terminated": {"exitCode": 0, "reason": "Completed"}}
+            }
+        elif s["phase"] == "Failed" and "exitCode" in s:
+            cs = {
+                "name": info["container_name"],
+                "state": {"running": None, "waiting": None,
+                          "terminated": {"exitCode": s["exitCode"], "reason": s.get("reason")}}
+            }
+        else:
+            cs = {
+                "name": info["container_name"],
+                "state": {"running": None, "terminated": None,
+                          "waiting": {"reason": s.get("reason","Pending"), "message": s.get("message")}}
+            }
+
+        return {
+            "name": info["name"],
+            "UID": uid,
+            "JID": info.get("jid"),
+            "namespace": namespace,
+            "containers": [cs],
+            "stale": stale,
+        }
+
+    def _mirror_logs(self, uid: str, info: dict, runner: HPCRunner):
+        """Fetch the final logs of a terminated HPC job into the local spool (best effort)."""
+        try:
+            pilot = self._pilot(info)
+            files = pilot.fetch_final_logs(uid) if pilot else runner.fetch_final_logs(info["jid"], uid)
+        except Exception:
+            log.warning("Could not mirror logs for %s (job %s)", uid, info["jid"], exc_info=True)
+            return
+        if not files:
+            return
+        self.spool.put(uid, files)
+
+        def mirrored(r: dict) -> dict:
+            r["logs_mirrored"] = True
+            return r
+
+        if self.state.update(uid, mirrored) is None:
+            self.spool.remove(uid)   # pod deleted while its logs were being fetched
 
     # ---------- /getLogs ----------
     def get_logs(self, req) -> str:
         info = self.state.get(req.PodUID)
         if not info:
             raise RuntimeError("No container recorded for this pod")
+        if not info.get("jid"):
+            return f"Pod {req.PodUID} is {info.get('status')}; no logs yet."
 
         if info["mode"] == "local":
             runner = LocalRunner()
             logs = runner.logs(info["jid"], tail=req.Opts.Tail, previous=req.Opts.Previous, timestamps=req.Opts.Timestamps)
         else:
-            runner = HPCRunner(target=info.get("target","local"))
-            logs = runner.logs_hpc(info["jid"], tail=req.Opts.Tail)
+            # terminated jobs are served from the local mirror; it may have been evicted
+            if info.get("logs_mirrored"):
+                logs = self.spool.read(req.PodUID, tail=req.Opts.Tail, limit_bytes=req.Opts.LimitBytes)
+                if logs is not None:
+                    return logs
+            pilot = self._pilot(info)
+            if pilot:
+                logs = pilot.logs(req.PodUID, tail=req.Opts.Tail)
+            else:
+                runner = HPCRunner(target=info.get("target","local"))
+                logs = runner.logs_hpc(info["jid"], tail=req.Opts.Tail)
 
         return logs
 
@@ -195,9 +402,13 @@ class AutolauncherAdapter:
         if not info:
             return
 
-        if info["mode"] == "local":
-            LocalRunner().delete(info["jid"])
-        else:
-            HPCRunner(target=info.get("target","local")).delete_hpc(info["jid"])
+        # not submitted yet: dropping the record is enough (an in-flight
+        # submission notices the record is gone and cancels its job), except
+        # that a failed HPC attempt may already hold a sandbox reference
+        if info.get("jid") or (info["mode"] != "local" and info.get("attempts")):
+            self._cancel(uid, info)
+        if info["mode"] != "local":
+            self.spool.remove(uid)
+        volumes.cleanup(uid)
 
         self.state.remove(uid)
@@ -0,0 +1,53 @@
+import threading, time
+from collections import deque
+
+
+class ChangeLog:
+    """
+    In-memory log of pod status changes for /watch.
+
+    Every change bumps a monotonically increasing revision. Revisions start at
+    the process start time in ms, so they keep increasing across restarts; a
+    client revision older than what is retained (or from a previous process)
+    gets a full resync instead of a diff.
+    """
+
+    def __init__(self, maxlen: int = 10000):
+        self._cond = threading.Condition()
+        self._entries: deque[tuple[int, str]] = deque()
+        self._maxlen = maxlen
+        self._rev = time.time_ns() // 1_000_000
+        # every change after _floor is still in _entries
+        self._floor = self._rev
+
+    @property
+    def revision(self) -> int:
+        with self._cond:
+            return self._rev
+
+    def record(self, uid: str):
+        with self._cond:
+            self._rev += 1
+            if len(self._entries) >= self._maxlen:
+                self._floor = self._entries.popleft()[0]
+            self._entries.append((self._rev, uid))
+            self._cond.notify_all()
+
+    def since(self, rev: int, timeout: float) -> tuple[int, list[str] | None]:
+        """
+        Block up to timeout seconds until something changed after rev.
+        Returns (current revision, changed uids in order); uids is None when rev
+        cannot be served incrementally and the client must resync.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if rev < self._floor or rev > self._rev:
+                return self._rev, None
+            while self._rev <= rev:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    break
+            if rev < self._floor:
+                return self._rev, None
+            uids = list(dict.fromkeys(u for r, u in self._entries if r > rev))
+            return self._rev, uids
@@ -0,0 +1,72 @@
+import threading, time
+
+
+class TargetUnavailable(RuntimeError):
+    """Raised instead of contacting a target whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-target breaker shared by every HPCRunner of the process:
+      - closed:    calls go through; `failure_threshold` consecutive transport
+                   failures open the breaker
+      - open:      calls fail fast with TargetUnavailable for `reset_timeout` s
+      - half-open: a single probe call is let through; success closes the
+                   breaker, failure re-opens it
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        with self._lock:
+            st = self._state()
+            if st == "closed":
+                return
+            if st == "half-open" and not self._probing:
+                self._probing = True
+                return
+            raise TargetUnavailable(f"HPC target '{self.name}' is unreachable (circuit {st}); failing fast.")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+_BREAKERS: dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def breaker_for(name: str, failure_threshold: int = 3, reset_timeout: float = 30.0) -> CircuitBreaker:
+    with _BREAKERS_LOCK:
+        b = _BREAKERS.get(name)
+        if b is None:
+            b = _BREAKERS[name] = CircuitBreaker(name, failure_threshold, reset_timeout)
+        return b
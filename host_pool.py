@@ -0,0 +1,51 @@
+import threading
+
+# weight of the newest sample in the latency moving averages
+_ALPHA = 0.3
+
+
+class HostStats:
+    """
+    Exponentially weighted latencies (seconds) of one login host: SSH connect
+    and short scheduler queries (squeue/sacct), not submissions or transfers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connect: float | None = None
+        self.exec: float | None = None
+
+    @staticmethod
+    def _ewma(prev: float | None, sample: float) -> float:
+        return sample if prev is None else (1 - _ALPHA) * prev + _ALPHA * sample
+
+    def observe_connect(self, seconds: float):
+        with self._lock:
+            self.connect = self._ewma(self.connect, seconds)
+
+    def observe_exec(self, seconds: float):
+        with self._lock:
+            self.exec = self._ewma(self.exec, seconds)
+
+    @property
+    def score(self) -> float:
+        # never-measured hosts score 0 so they get tried (and measured) first
+        with self._lock:
+            return (self.connect or 0.0) + (self.exec or 0.0)
+
+
+_STATS: dict[tuple[str, str], HostStats] = {}
+_STATS_LOCK = threading.Lock()
+
+
+def stats_for(target: str, host: str) -> HostStats:
+    with _STATS_LOCK:
+        st = _STATS.get((target, host))
+        if st is None:
+            st = _STATS[(target, host)] = HostStats()
+        return st
+
+
+def rank_hosts(target: str, hosts: list[str]) -> list[str]:
+    """Hosts of a target, fastest first (stable for ties, so config order breaks them)."""
+    return sorted(hosts, key=lambda h: stats_for(target, h).score)
@@ -0,0 +1,131 @@
+import os, json, time, threading, logging
+from concurrent.futures import ThreadPoolExecutor, Future
+from state import FileLock
+from utils import run
+
+log = logging.getLogger("autolauncher")
+
+_DEFAULT_PATH = os.environ.get("PLUGIN_IMAGES_PATH", "/var/lib/interlink-autolauncher-plugin/images.json")
+_BUDGET_GB    = float(os.environ.get("PLUGIN_IMAGE_BUDGET_GB", "20"))
+_PREPULL      = os.environ.get("PLUGIN_PREPULL_IMAGES", "")
+_PULL_WORKERS = int(os.environ.get("PLUGIN_PULL_WORKERS", "2"))
+_PULL_TIMEOUT = float(os.environ.get("PLUGIN_PULL_TIMEOUT", "900"))
+# recently used images are kept even over budget: a launch may be about to use them
+_EVICT_GRACE  = 300
+
+
+class ImagePuller:
+    """
+    Docker image pre-pull for local mode.
+
+    - prefetch(image) starts a background pull as soon as a pod is announced;
+      ensure(image) waits for it. Concurrent requests for one image share a
+      single in-flight pull.
+    - Only images pulled here are tracked in images.json with their last use
+      and evicted least-recently-used first (never while a container uses
+      them, never the PLUGIN_PREPULL_IMAGES ones) once they exceed the disk
+      budget. Images already on the host are used but never removed.
+    - A pull is killed after pull_timeout seconds, and ensure() waits at most
+      that long by default.
+    """
+
+    def __init__(self, path: str = _DEFAULT_PATH, budget_gb: float = _BUDGET_GB,
+                 pinned: list[str] | None = None, workers: int = _PULL_WORKERS,
+                 pull_timeout: float = _PULL_TIMEOUT):
+        self.path = path
+        self.pull_timeout = pull_timeout
+        self.budget_bytes = int(budget_gb * 1024 ** 3)
+        self.pinned = pinned if pinned is not None else [i.strip() for i in _PREPULL.split(",") if i.strip()]
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if not os.path.exists(self.path):
+            self._write({"images": {}})
+        self._lock = FileLock(self.path + ".lock")
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="image-pull")
+        self._inflight: dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    def _read(self) -> dict:
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def _write(self, data: dict):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def touch(self, image: str, track: bool = False):
+        """Record a use of image if it is tracked; track=True starts tracking it."""
+        with self._lock:
+            db = self._read()
+            if track or image in db["images"]:
+                db["images"][image] = time.time()
+                self._write(db)
+
+    # ---------- pulling ----------
+    @staticmethod
+    def _present(image: str) -> bool:
+        return run(["docker", "image", "inspect", image, "--format", "{{.Id}}"], check=False).returncode == 0
+
+    def _pull(self, image: str):
+        if self._present(image):
+            self.touch(image)
+            return
+        t0 = time.monotonic()
+        run(["docker", "pull", image], check=True, timeout=self.pull_timeout)
+        log.info("Pulled %s in %.1fs", image, time.monotonic() - t0)
+        self.touch(image, track=True)
+        self.evict()
+
+    def prefetch(self, image: str) -> Future:
+        """Start (or join) the pull of image without waiting for it."""
+        with self._inflight_lock:
+            fut = self._inflight.get(image)
+            if fut is None:
+                fut = self._pool.submit(self._pull, image)
+                self._inflight[image] = fut
+                fut.add_done_callback(lambda _f, i=image: self._done(i))
+            return fut
+
+    def _done(self, image: str):
+        with self._inflight_lock:
+            self._inflight.pop(image, None)
+
+    def ensure(self, image: str, timeout: float | None = None):
+        """Block until image is available locally (raises if the pull failed or timed out)."""
+        self.prefetch(image).result(timeout or self.pull_timeout)
+
+    def prefetch_configured(self):
+        for image in self.pinned:
+            self.prefetch(image)
+
+    # ---------- eviction ----------
+    def evict(self):
+        with self._lock:
+            db = self._read()
+            tracked = db["images"]
+            sizes = {}
+            for image in tracked:
+                r = run(["docker", "image", "inspect", image, "--format", "{{.Size}}"], check=False)
+                if r.returncode == 0 and r.stdout.strip().isdigit():
+                    sizes[image] = int(r.stdout.strip())
+            # images removed outside the plugin are forgotten
+            for image in [i for i in tracked if i not in sizes]:
+                tracked.pop(image)
+            total = sum(sizes.values())
+            for image in sorted(tracked, key=tracked.get):
+                if total <= self.budget_bytes:
+                    break
+                if image in self.pinned or time.time() - tracked[image] < _EVICT_GRACE:
+                    continue
+                with self._inflight_lock:
+                    if image in self._inflight and not self._inflight[image].done():
+                        continue
+                in_use = run(["docker", "ps", "-aq", "--filter", f"ancestor={image}"], check=False).stdout.strip()
+                if in_use:
+                    continue
+                if run(["docker", "rmi", image], check=False).returncode == 0:
+                    log.info("Evicted image %s (%d bytes)", image, sizes[image])
+                    total -= sizes[image]
+                    tracked.pop(image)
+            self._write(db)
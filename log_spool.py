@@ -0,0 +1,119 @@
+import os, json, mmap, shutil, time
+from state import FileLock
+
+_DEFAULT_DIR = os.environ.get("PLUGIN_LOG_SPOOL_DIR", "/var/lib/interlink-autolauncher-plugin/logs")
+_DEFAULT_MAX_BYTES = int(os.environ.get("PLUGIN_LOG_SPOOL_MAX_BYTES", str(512 * 1024 * 1024)))
+# files bigger than this are tailed through mmap instead of being read whole
+_MMAP_THRESHOLD = 1024 * 1024
+
+
+class LogSpool:
+    """
+    Local mirror of the final logs of terminated HPC jobs.
+
+    Layout: <dir>/<uid>/index.json + one file per remote log, in display order.
+    The index mtime is bumped on every read and is used as the LRU clock;
+    whole entries are evicted oldest-first once the spool exceeds max_bytes.
+    """
+
+    def __init__(self, path: str = _DEFAULT_DIR, max_bytes: int = _DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = FileLock(os.path.join(self.path, ".lock"))
+
+    def _entry(self, uid: str) -> str:
+        return os.path.join(self.path, uid.replace("/", "_"))
+
+    def has(self, uid: str) -> bool:
+        return os.path.exists(os.path.join(self._entry(uid), "index.json"))
+
+    def put(self, uid: str, files: list[tuple[str, bytes]]):
+        """Store [(remote_path, content), ...] for uid, replacing any previous entry."""
+        with self._lock:
+            entry = self._entry(uid)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.makedirs(entry)
+            index = []
+            for i, (label, data) in enumerate(files):
+                fname = f"{i}.log"
+                with open(os.path.join(entry, fname), "wb") as f:
+                    f.write(data)
+                index.append({"label": label, "file": fname})
+            tmp = os.path.join(entry, "index.json.tmp")
+            with open(tmp, "w") as f:
+                json.dump({"files": index, "stored_at": time.time()}, f)
+            os.replace(tmp, os.path.join(entry, "index.json"))
+            self._evict(keep=uid)
+
+    def remove(self, uid: str):
+        with self._lock:
+            shutil.rmtree(self._entry(uid), ignore_errors=True)
+
+    def read(self, uid: str, tail: int | None, limit_bytes: int | None = None) -> str | None:
+        """Render the spooled logs like HPCRunner.logs_hpc does. None if not spooled."""
+        entry = self._entry(uid)
+        idx_path = os.path.join(entry, "index.json")
+        try:
+            with open(idx_path, "r") as f:
+                index = json.load(f)
+            os.utime(idx_path)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        n = tail or 200
+        chunks: list[str] = []
+        for i, item in enumerate(index["files"]):
+            try:
+                data = self._tail_file(os.path.join(entry, item["file"]), n)
+            except FileNotFoundError:
+                return None
+            if item["label"]:
+                if i:
+                    chunks.append("\n")
+                chunks.append(f"===== {item['label']} =====\n")
+            chunks.append(data.decode(errors="replace"))
+        out = "".join(chunks)
+        if limit_bytes is not None and limit_bytes >= 0:
+            out = out.encode()[:limit_bytes].decode(errors="ignore")
+        return out
+
+    @staticmethod
+    def _tail_file(path: str, n: int) -> bytes:
+        size = os.path.getsize(path)
+        if size == 0:
+            return b""
+        with open(path, "rb") as f:
+            if size < _MMAP_THRESHOLD:
+                return b"".join(f.read().splitlines(keepends=True)[-n:])
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                end = size - 1 if m[size - 1:size] == b"\n" else size
+                pos = end
+                for _ in range(n):
+                    pos = m.rfind(b"\n", 0, pos)
+                    if pos < 0:
+                        break
+                return m[pos + 1:]
+
+    def _evict(self, keep: str | None = None):
+        entries = []
+        total = 0
+        for name in os.listdir(self.path):
+            entry = os.path.join(self.path, name)
+            if not os.path.isdir(entry):
+                continue
+            size = sum(e.stat().st_size for e in os.scandir(entry) if e.is_file())
+            try:
+                last_used = os.path.getmtime(os.path.join(entry, "index.json"))
+            except FileNotFoundError:
+                last_used = 0.0
+            entries.append((last_used, name, size))
+            total += size
+        keep_name = keep.replace("/", "_") if keep else None
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep_name:
+                continue
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+            total -= size
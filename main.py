@@ -5,13 +5,21 @@ from typing import List, Union
 
 from autolauncher_adapter import AutolauncherAdapter
 from plugin_state import PluginState
+from changelog import ChangeLog
+from log_spool import LogSpool
 
 import logging, traceback
 log = logging.getLogger("autolauncher")
 
 app = FastAPI(debug=True)
-state = PluginState()
-adapter = AutolauncherAdapter(state)
+changes = ChangeLog()
+state = PluginState(on_change=changes.record)
+adapter = AutolauncherAdapter(state, LogSpool())
+
+
+@app.on_event("startup")
+def _start_submitter():
+    adapter.start()
 
 
 # ---- Pydantic base that tolerates extra fields from InterLink ----
@@ -27,17 +35,41 @@ class Metadata(APIModel):
     annotations: dict[str, str] | None = None
 
 
+class VolumeMount(APIModel):
+    name: str
+    mountPath: str
+    subPath: str | None = None
+    readOnly: bool | None = None
+
+
 class Container(APIModel):
     name: str
     image: str
     # InterLink may send strings; accept both list and str
     command: list[str] | str | None = None
     args: list[str] | str | None = None
+    volumeMounts: List[VolumeMount] | None = None
+
+
+class ConfigMapVolumeSource(APIModel):
+    name: str | None = None
+
+
+class SecretVolumeSource(APIModel):
+    secretName: str | None = None
+
+
+class PodVolume(APIModel):
+    name: str
+    configMap: ConfigMapVolumeSource | None = None
+    secret: SecretVolumeSource | None = None
+    emptyDir: dict | None = None
 
 
 class PodSpec(APIModel):
     containers: List[Container]
     initContainers: List[Container] | None = None
+    volumes: List[PodVolume] | None = None
 
 
 class PodRequest(APIModel):
@@ -45,8 +77,24 @@ class PodRequest(APIModel):
     spec: PodSpec
 
 
+class ConfigMap(APIModel):
+    metadata: Metadata
+    data: dict[str, str] | None = None
+    binaryData: dict[str, str] | None = None   # base64
+
+
+class Secret(APIModel):
+    metadata: Metadata
+    data: dict[str, str] | None = None         # base64
+    stringData: dict[str, str] | None = None
+
+
 class Volume(APIModel):
+    """Objects InterLink retrieved for one container (what its volumes refer to)."""
     name: str
+    configMaps: List[ConfigMap] | None = None
+    secrets: List[Secret] | None = None
+    emptyDirs: List[str] | None = None
 
 
 class Pod(APIModel):
@@ -85,6 +133,8 @@ class PodStatus(APIModel):
     JID: str | None = None
     namespace: str
     containers: List[ContainerStatus]
+    # True when the target was unreachable and this is the last known status
+    stale: bool = False
 
 
 class CreateStruct(APIModel):
@@ -92,6 +142,14 @@ class CreateStruct(APIModel):
     PodJID: str
 
 
+class WatchResponse(APIModel):
+    revision: int
+    # True when `since` could not be served incrementally: pods holds every known pod
+    reset: bool = False
+    pods: List[PodStatus]
+    deleted: List[str] = []
+
+
 class LogOpts(APIModel):
     Tail: int | None = None
     LimitBytes: int | None = None
@@ -157,6 +215,37 @@ def status_pod_get(uid: List[str] | None = Query(None, description="Repeat ?uid=
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/watch", response_model=WatchResponse)
+def watch(
+    since: int | None = Query(None, description="Revision returned by the previous /watch call"),
+    timeout: float = Query(30.0, description="Seconds to wait for a change (max 60)"),
+):
+    """
+    Long-poll for status changes: returns the pods whose status changed after
+    revision `since`, blocking up to `timeout` seconds while nothing changed.
+    Without `since` (or when it is too old) every pod is returned with reset=true.
+    Statuses come from the state file; no backend is contacted.
+    """
+    try:
+        if since is None:
+            rev, uids = changes.revision, None
+        else:
+            rev, uids = changes.since(since, max(0.0, min(timeout, 60.0)))
+        reset = uids is None
+        if reset:
+            uids = list(state.all().keys())
+        pods, deleted = [], []
+        for u in uids:
+            st = adapter.cached_status(u)
+            if st:
+                pods.append(st)
+            else:
+                deleted.append(u)
+        return {"revision": rev, "reset": reset, "pods": pods, "deleted": deleted}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/getLogs", response_class=PlainTextResponse)
 def get_logs_get(
     uid: str = Query(..., description="Pod UID"),
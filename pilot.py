@@ -0,0 +1,513 @@
+import os, json, io, posixpath, re, shlex, tarfile, time, uuid
+from state import FileLock
+from sandbox_cache import SandboxCache
+from volumes import VolumeStager
+from runner import HPCRunner, _normalize_gres
+from utils import now_rfc3339
+
+_DEFAULT_PATH = os.environ.get("PLUGIN_PILOTS_PATH", "/var/lib/interlink-autolauncher-plugin/pilots.json")
+
+# Per cluster, as autolauncher.py's launcher writers run it: (singularity binary,
+# extra exec flags, setup lines). The GPFS data bind and --writable are common to both.
+_SINGULARITY = {
+    "amd": ("singularity", "--rocm ", ["module load rocm singularity"]),
+    "mn4": ("/apps/SINGULARITY/{version}/bin/singularity", "", []),
+}
+_GPFS_DATA_BIND = "/gpfs/projects/bsc70/hpai/storage/data/:/gpfs/projects/bsc70/hpai/storage/data/"
+_LAUNCHER_ENV = [
+    "export PYTHONPATH=src",
+    'export SINGULARITYENV_AWS_ACCESS_KEY_ID="$MINIO_ACCESS_KEY"',
+    'export SINGULARITYENV_AWS_SECRET_ACCESS_KEY="$MINIO_SECRET_KEY"',
+    "export SINGULARITYENV_MINIO_DOMAIN=https://localhost:9000",
+    "export SINGULARITYENV_SSEC_KEY=$SSEC_KEY",
+    "export SINGULARITYENV_ZIP_KEY=$ZIP_KEY",
+    "unset TMPDIR",
+]
+
+# SLURM states in which a pilot job is definitely over
+_ENDED_STATES = {"COMPLETED", "CANCELLED", "FAILED", "TIMEOUT", "NODE_FAIL", "PREEMPTED",
+                 "OUT_OF_MEMORY", "BOOT_FAIL", "DEADLINE"}
+
+# Uploaded as <pilot dir>/agent.sh and run as the pilot job's batch step.
+_AGENT = r'''#!/bin/bash
+# Pilot agent: runs every tasks/<uid>.task dropped by the plugin as an srun step
+# of this allocation. Per task it writes <uid>.started and <uid>.rc; a
+# <uid>.cancel file kills the step. A task whose sandbox NEED is missing fails
+# (rc 125, cause in <uid>.reason) at once if no build job BUILD was named, else
+# once that build job is gone without producing it. Exits after IDLE seconds
+# without work, renaming tasks/ so the plugin stops placing pods here.
+cd "$1" || exit 1
+IDLE="${2:-300}"
+declare -A PIDS
+# consecutive passes in which a task's build job was not in squeue
+declare -A MISSES
+
+unfinished() {
+  for f in "$1"/*.task; do
+    [ -e "$f" ] || continue
+    u=$(basename "$f" .task)
+    [ -e "$1/$u.rc" ] || echo "$u"
+  done
+}
+
+idle_since=$(date +%s)
+while true; do
+  for spec in tasks/*.task; do
+    [ -e "$spec" ] || continue
+    uid=$(basename "$spec" .task)
+    if [ -n "${PIDS[$uid]:-}" ] || [ -e "tasks/$uid.rc" ]; then continue; fi
+    if [ -e "tasks/$uid.cancel" ]; then echo 143 > "tasks/$uid.rc"; continue; fi
+    CPUS=1; GPUS=0; NEED=""; BUILD=""
+    . "$spec"
+    # container sandbox still being built
+    if [ -n "$NEED" ] && [ ! -d "$NEED" ]; then
+      if [ -z "$BUILD" ]; then
+        echo "Container sandbox $NEED does not exist" > "tasks/$uid.err"
+        echo SandboxMissing > "tasks/$uid.reason"; echo 125 > "tasks/$uid.rc"; continue
+      fi
+      # the build job removes $NEED.build when it ends; a killed one leaves it behind
+      if [ -d "$NEED.build" ] && squeue -h -j "$BUILD" -o %i 2>/dev/null | grep -q .; then
+        MISSES[$uid]=0; continue
+      fi
+      MISSES[$uid]=$(( ${MISSES[$uid]:-0} + 1 ))
+      # two misses in a row, so one failed squeue call does not kill the task
+      if [ -d "$NEED.build" ] && [ "${MISSES[$uid]}" -lt 2 ]; then continue; fi
+      [ -d "$NEED" ] && continue
+      echo "Sandbox build job $BUILD ended without producing $NEED" > "tasks/$uid.err"
+      echo SandboxBuildFailed > "tasks/$uid.reason"; echo 125 > "tasks/$uid.rc"; unset "MISSES[$uid]"; continue
+    fi
+    gres=""; if [ "$GPUS" -gt 0 ]; then gres="--gres=gpu:$GPUS"; fi
+    date -u +%Y-%m-%dT%H:%M:%SZ > "tasks/$uid.started"
+    ( srun --exclusive -N1 -n1 -c "$CPUS" $gres bash "tasks/$uid.sh" > "tasks/$uid.out" 2> "tasks/$uid.err"
+      echo $? > "tasks/$uid.rc.tmp"; mv "tasks/$uid.rc.tmp" "tasks/$uid.rc" ) &
+    PIDS[$uid]=$!
+  done
+
+  for uid in "${!PIDS[@]}"; do
+    pid=${PIDS[$uid]}
+    if ! kill -0 "$pid" 2>/dev/null; then unset "PIDS[$uid]"; continue; fi
+    if [ -e "tasks/$uid.cancel" ]; then pkill -TERM -P "$pid"; fi
+  done
+
+  if [ "${#PIDS[@]}" -gt 0 ] || [ -n "$(unfinished tasks)" ]; then
+    idle_since=$(date +%s)
+  elif [ $(( $(date +%s) - idle_since )) -ge "$IDLE" ]; then
+    mv tasks tasks.closed
+    # a task dropped just before the rename must still run
+    if [ -n "$(unfinished tasks.closed)" ]; then
+      mv tasks.closed tasks; idle_since=$(date +%s)
+    else
+      exit 0
+    fi
+  fi
+  sleep 5
+done
+'''
+
+
+def slurm_seconds(t: str) -> int:
+    """SLURM time spec ('MM', 'MM:SS', 'HH:MM:SS', 'D-HH[:MM[:SS]]') -> seconds."""
+    t = str(t).strip()
+    days = 0
+    if "-" in t:
+        d, t = t.split("-", 1)
+        days = int(d)
+        parts = [int(x) for x in t.split(":")]
+        parts += [0] * (3 - len(parts))
+        h, m, s = parts
+    else:
+        parts = [int(x) for x in t.split(":")]
+        if len(parts) == 1:
+            h, m, s = 0, parts[0], 0
+        elif len(parts) == 2:
+            h, m, s = 0, parts[0], parts[1]
+        else:
+            h, m, s = parts
+    return ((days * 24 + h) * 60 + m) * 60 + s
+
+
+class PilotPool:
+    """
+    Local registry of pilot allocations and the pods packed into them.
+
+    Pilot record: id, target, shape, jid, dir, cpus, gpus, expires_at, closed,
+    tasks {uid: {cpus, gpus, done}}. expires_at is counted from submission, so it
+    underestimates the real end of the allocation (safe for placement).
+    Finished tasks stay listed (status and logs still find their pilot) until
+    the pod is deleted, but no longer count against its free CPUs/GPUs.
+    """
+
+    def __init__(self, path: str = _DEFAULT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if not os.path.exists(self.path):
+            self._write({"pilots": {}})
+        self._lock = FileLock(self.path + ".lock")
+
+    def _read(self) -> dict:
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def _write(self, data: dict):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def _free(p: dict) -> tuple[int, int]:
+        running = [t for t in p["tasks"].values() if not t.get("done")]
+        used_c = sum(t["cpus"] for t in running)
+        used_g = sum(t["gpus"] for t in running)
+        return p["cpus"] - used_c, p["gpus"] - used_g
+
+    def lookup(self, uid: str) -> dict | None:
+        with self._lock:
+            for p in self._read()["pilots"].values():
+                if uid in p["tasks"]:
+                    return p
+            return None
+
+    def reserve(self, uid: str, shape: str, cpus: int, gpus: int, wall_s: int) -> dict | None:
+        """
+        Best-fit placement: among open pilots of the same shape that can hold the
+        pod for its whole wall time, take the one left with the least free CPUs
+        (then GPUs). Idempotent per uid. None if a new pilot is needed.
+        """
+        with self._lock:
+            db = self._read()
+            now = time.time()
+            best, best_key = None, None
+            for p in db["pilots"].values():
+                if uid in p["tasks"]:
+                    return p
+                if p["closed"] or p["shape"] != shape or p["expires_at"] - now < wall_s:
+                    continue
+                fc, fg = self._free(p)
+                if fc < cpus or fg < gpus:
+                    continue
+                key = (fc - cpus, fg - gpus)
+                if best_key is None or key < best_key:
+                    best, best_key = p, key
+            if best is None:
+                return None
+            best["tasks"][uid] = {"cpus": cpus, "gpus": gpus}
+            self._write(db)
+            return best
+
+    def add(self, pilot: dict, uid: str, cpus: int, gpus: int) -> dict:
+        with self._lock:
+            db = self._read()
+            pilot["tasks"][uid] = {"cpus": cpus, "gpus": gpus}
+            db["pilots"][pilot["id"]] = pilot
+            self._write(db)
+            return pilot
+
+    def finish(self, uid: str):
+        """Mark the task of uid as ended; its resources become free for placement."""
+        with self._lock:
+            db = self._read()
+            for p in db["pilots"].values():
+                t = p["tasks"].get(uid)
+                if t is not None and not t.get("done"):
+                    t["done"] = True
+                    self._write(db)
+                    return
+
+    def release(self, uid: str):
+        with self._lock:
+            db = self._read()
+            for pid, p in list(db["pilots"].items()):
+                if p["tasks"].pop(uid, None) is not None and p["closed"] and not p["tasks"]:
+                    db["pilots"].pop(pid)
+            self._write(db)
+
+    def close(self, pilot_id: str):
+        """Stop placing pods in this pilot (its agent exited or its job ended)."""
+        with self._lock:
+            db = self._read()
+            p = db["pilots"].get(pilot_id)
+            if p is None:
+                return
+            if p["tasks"]:
+                p["closed"] = True
+            else:
+                db["pilots"].pop(pilot_id)
+            self._write(db)
+
+
+class PilotExecutor:
+    """
+    HPC execution mode that packs pods into long-lived pilot allocations
+    (annotation interlink.autolauncher/executor: pilot).
+
+    A pilot is one sbatch job per target/account/qos/partition/GPU shape running
+    the pilot agent; pods become srun steps of it, so queue wait is paid once
+    per pilot. Pods run in their Singularity sandbox (containerref or the
+    SandboxCache), launched the way autolauncher.py's writer for the target's
+    cluster does it ('amd' or 'mn4'). Target keys (optional): pilot_cpus (16),
+    pilot_gpus (0), pilot_time ('04:00:00'), pilot_idle (300 s).
+    """
+
+    def __init__(self, runner: HPCRunner, pool: PilotPool):
+        self.runner = runner
+        self.pool = pool
+        t = runner.target
+        self.pilot_cpus = int(t.get("pilot_cpus", 16))
+        self.pilot_gpus = int(t.get("pilot_gpus", 0))
+        self.pilot_time = str(t.get("pilot_time", "04:00:00"))
+        self.pilot_idle = int(t.get("pilot_idle", 300))
+
+    # ---------- launch ----------
+    def launch(self, uid: str, image: str, command: list[str], args: list[str],
+               annotations: dict[str, str] | None = None, volumes: list[dict] | None = None) -> str:
+        a = annotations or {}
+        t = self.runner.target
+        qos       = a.get("interlink.autolauncher/qos", t.get("qos", "debug"))
+        account   = a.get("interlink.autolauncher/account", t.get("account", None))
+        partition = a.get("interlink.autolauncher/partition", t.get("partition", None))
+        wall_s    = slurm_seconds(a.get("interlink.autolauncher/time", "00:10:00"))
+        cpus      = int(a.get("interlink.autolauncher/ntasks", "1")) * int(a.get("interlink.autolauncher/cpus-per-task", "1"))
+        gpus      = int(_normalize_gres(a.get("interlink.autolauncher/gres")) or 0)
+        if account in (None, "",):
+            raise RuntimeError("No SLURM account set. Provide 'interlink.autolauncher/account' or set 'account' in the target config.")
+        if cpus > self.pilot_cpus or gpus > self.pilot_gpus or wall_s > slurm_seconds(self.pilot_time):
+            raise RuntimeError(
+                f"Pod needs {cpus} CPUs / {gpus} GPUs for {wall_s}s; pilots of target "
+                f"'{self.runner.target_name}' offer {self.pilot_cpus} / {self.pilot_gpus} for {self.pilot_time}."
+            )
+        shape = "|".join([self.runner.target_name, account, qos or "", partition or "", "gpu" if gpus else "cpu"])
+
+        env_pairs = [f"SBATCH_ACCOUNT={shlex.quote(account)}"]
+        if partition:
+            env_pairs.append(f"SBATCH_PARTITION={shlex.quote(partition)}")
+        if qos:
+            env_pairs.append(f"SBATCH_QOS={shlex.quote(qos)}")
+        env_prefix = "env " + " ".join(env_pairs) + " "
+
+        cluster = a.get("interlink.autolauncher/cluster", t.get("cluster", "amd"))
+        singv   = a.get("interlink.autolauncher/singularity_version", t.get("singularity_version", "3.6.4"))
+        if cluster not in _SINGULARITY:
+            raise RuntimeError(f"Pilot executor does not support cluster '{cluster}' (supported: {', '.join(_SINGULARITY)}).")
+        binds = [b.strip() for b in (a.get("interlink.autolauncher/bind") or "").split(",") if b.strip()]
+        _, _, shell_line = self.runner._shell_from_k8s(command, args)
+        container_ref = (a.get("interlink.autolauncher/containerref") or "").strip()
+
+        with self.runner._session() as c:
+            build_jid = None
+            if container_ref:
+                containerdir = posixpath.join(t["containerdir_base"], container_ref)
+            else:
+                # the agent holds the task back until the sandbox exists (or its build failed)
+                containerdir, build_jid = SandboxCache(self.runner).acquire(c, uid, image, env_prefix)
+            job_dir = posixpath.join(t["workdir_base"], uid)
+            binds = binds + VolumeStager(self.runner).stage(c, uid, job_dir, volumes or [])
+            for _ in range(3):
+                pilot = self.pool.reserve(uid, shape, cpus, gpus, wall_s)
+                if pilot is None:
+                    pilot = self.pool.add(self._submit_pilot(c, shape, env_prefix, bool(gpus)), uid, cpus, gpus)
+                try:
+                    self._dispatch(c, pilot, uid, cpus, gpus, containerdir, build_jid, binds,
+                                   self._exec_line(cluster, singv, containerdir, binds, shell_line))
+                    return pilot["jid"]
+                except FileNotFoundError:
+                    # agent closed the pilot between placement and upload
+                    self.pool.release(uid)
+                    self.pool.close(pilot["id"])
+            raise RuntimeError(f"Could not place pod {uid} in a pilot of target '{self.runner.target_name}'.")
+
+    def _submit_pilot(self, c, shape: str, env_prefix: str, gpu: bool) -> dict:
+        pid = uuid.uuid4().hex[:12]
+        pdir = posixpath.join(self.runner.target["workdir_base"], "_pilots", pid)
+        gpus = self.pilot_gpus if gpu else 0
+        rc, out, err = self.runner._ssh(c, f"mkdir -p {shlex.quote(posixpath.join(pdir, 'tasks'))}")
+        if rc != 0:
+            raise RuntimeError(f"Failed to create pilot dir. rc={rc}\nSTDERR:\n{err}")
+        sftp = self.runner._open_sftp(c)
+        try:
+            with sftp.file(posixpath.join(pdir, "agent.sh"), "w") as f:
+                f.write(_AGENT)
+        finally:
+            sftp.close()
+        gres = f"--gres=gpu:{gpus} " if gpus else ""
+        cmd = (
+            f"{env_prefix}sbatch --parsable -J pilot-{pid} -t {shlex.quote(self.pilot_time)} "
+            f"-N 1 -n {self.pilot_cpus} -c 1 {gres}--chdir {shlex.quote(pdir)} "
+            f"-o {shlex.quote(posixpath.join(pdir, 'pilot_%j.out'))} "
+            f"--wrap {shlex.quote(f'bash agent.sh . {self.pilot_idle}')}"
+        )
+        rc, out, err = self.runner._ssh(c, cmd)
+        m = re.match(r"\s*(\d+)", out)
+        if rc != 0 or not m:
+            raise RuntimeError(f"Pilot submission failed. rc={rc}\nSTDERR:\n{err}\nSTDOUT:\n{out}")
+        return {
+            "id": pid, "target": self.runner.target_name, "shape": shape, "jid": m.group(1),
+            "dir": pdir, "cpus": self.pilot_cpus, "gpus": gpus,
+            "expires_at": time.time() + slurm_seconds(self.pilot_time),
+            "closed": False, "tasks": {},
+        }
+
+    @staticmethod
+    def _exec_line(cluster: str, singv: str, containerdir: str, binds: list[str], shell_line: str) -> list[str]:
+        """Task script body: same environment, binds and singularity flags as autolauncher.py's writer for cluster."""
+        singularity, flags, preamble = _SINGULARITY[cluster]
+        singularity = singularity.format(version=singv)
+        bind = " ".join(f"-B {shlex.quote(b)}" for b in [_GPFS_DATA_BIND] + binds)
+        return preamble + _LAUNCHER_ENV + [
+            f"exec {singularity} exec {flags}{bind} --writable {shlex.quote(containerdir)} "
+            f"bash -c {shlex.quote(shell_line)}"
+        ]
+
+    def _dispatch(self, c, pilot: dict, uid: str, cpus: int, gpus: int,
+                  containerdir: str, build_jid: str | None, binds: list[str], exec_lines: list[str]):
+        job_dir = posixpath.join(self.runner.target["workdir_base"], uid)
+        tasks = posixpath.join(pilot["dir"], "tasks")
+        script = (
+            "#!/bin/bash\n"
+            f"mkdir -p {shlex.quote(job_dir)} && cd {shlex.quote(job_dir)}\n"
+            + "\n".join(exec_lines) + "\n"
+        )
+        spec = (f"CPUS={cpus}\nGPUS={gpus}\nNEED={shlex.quote(containerdir)}\n"
+                f"BUILD={shlex.quote(build_jid or '')}\n")
+        sftp = self.runner._open_sftp(c)
+        try:
+            # .task is written last and renamed into place: it is what the agent picks up
+            for name, text in ((f"{uid}.sh", script), (f"{uid}.task", spec)):
+                tmp = posixpath.join(tasks, f".{name}.tmp")
+                with sftp.file(tmp, "w") as f:
+                    f.write(text)
+                sftp.posix_rename(tmp, posixpath.join(tasks, name))
+        finally:
+            sftp.close()
+
+    # ---------- status / logs / delete ----------
+    def _tasks_dir_expr(self, pilot: dict) -> str:
+        d = shlex.quote(pilot["dir"])
+        return f't={d}/tasks; [ -d "$t" ] || t={d}/tasks.closed'
+
+    def status(self, uid: str) -> dict:
+        with self.runner._session() as c:
+            return self.status_many(c, [uid])[uid]
+
+    def status_many(self, c, uids: list[str]) -> dict[str, dict]:
+        """Status of several pilot tasks of this target with one round trip on session c."""
+        result: dict[str, dict] = {}
+        by_pilot: dict[str, tuple[dict, list[str]]] = {}
+        for uid in uids:
+            pilot = self.pool.lookup(uid)
+            if not pilot:
+                result[uid] = {"phase": "Failed", "reason": "PilotLost"}
+            else:
+                by_pilot.setdefault(pilot["id"], (pilot, []))[1].append(uid)
+        if not by_pilot:
+            return result
+
+        parts = []
+        for pid, (pilot, members) in by_pilot.items():
+            checks = "\n".join(
+                f'''if [ -e "$t/"{shlex.quote(u + ".rc")} ]; then echo "T {u} RC $(cat "$t/"{shlex.quote(u + ".rc")}) $(cat "$t/"{shlex.quote(u + ".reason")} 2>/dev/null)"
+            elif [ -e "$t/"{shlex.quote(u + ".started")} ]; then echo "T {u} STARTED $(cat "$t/"{shlex.quote(u + ".started")})"
+            else echo "T {u} QUEUED"; fi'''
+                for u in members
+            )
+            parts.append(f"{self._tasks_dir_expr(pilot)}\n{checks}\n{self._pilot_state_cmd(pilot, pid)}")
+        rc, out, _ = self.runner._ssh(c, "\n".join(parts))
+
+        tasks: dict[str, tuple[str, str]] = {}
+        states: dict[str, str] = {}
+        for line in out.splitlines():
+            f = line.strip().split(" ", 3)
+            if len(f) >= 3 and f[0] == "T":
+                tasks[f[1]] = (f[2], f[3].strip() if len(f) > 3 else "")
+            elif len(f) >= 3 and f[0] == "P":
+                states[f[1]] = " ".join(f[2:]).split()[0].upper()
+
+        for pid, (pilot, members) in by_pilot.items():
+            # UNKNOWN (scheduler not answering) is neither alive nor ended: nothing is decided on it
+            pilot_state = states.get(pid, "UNKNOWN")
+            ended = pilot_state == "GONE" or pilot_state in _ENDED_STATES
+            if ended:
+                self.pool.close(pid)
+            for uid in members:
+                kind, value = tasks.get(uid, ("QUEUED", ""))
+                if kind == "RC":
+                    # kept in the pool until /delete so logs can still be fetched
+                    self.pool.finish(uid)
+                    code, _, reason = value.partition(" ")
+                    if code == "0":
+                        result[uid] = {"phase": "Succeeded"}
+                    else:
+                        result[uid] = {"phase": "Failed", "reason": reason.strip() or f"ExitCode{code}"}
+                elif ended:
+                    self.pool.finish(uid)
+                    result[uid] = {"phase": "Failed", "reason": "PilotEnded"}
+                elif kind == "STARTED":
+                    result[uid] = {"phase": "Running", "startedAt": value or now_rfc3339()}
+                else:
+                    result[uid] = {"phase": "Pending"}
+        return result
+
+    @staticmethod
+    def _pilot_state_cmd(pilot: dict, label: str) -> str:
+        """
+        Shell printing 'P <label> <state>' for the pilot job: its squeue state,
+        GONE once SLURM no longer lists it, its sacct state if squeue itself
+        failed, else UNKNOWN.
+        """
+        j = shlex.quote(pilot["jid"])
+        return f'''
+            if q=$(squeue -h -j {j} -o %T 2>&1); then echo "P {label} ${{q:-GONE}}"
+            elif echo "$q" | grep -qi "invalid job id"; then echo "P {label} GONE"
+            elif a=$(sacct -n -X -j {j} -o State%20 2>/dev/null | head -n1) && [ -n "$a" ]; then echo "P {label} $a"
+            else echo "P {label} UNKNOWN"; fi'''
+
+    def logs(self, uid: str, tail: int | None) -> str:
+        pilot = self.pool.lookup(uid)
+        if not pilot:
+            return f"No pilot task found for pod {uid}."
+        n = tail or 200
+        script = f'''
+            {self._tasks_dir_expr(pilot)}
+            for s in out err; do
+              f="$t/{uid}.$s"
+              if [ -e "$f" ]; then [ "$s" = err ] && echo; echo "===== $f ====="; tail -n {n} "$f"; fi
+            done
+            [ -e "$t/{uid}.out" ] || [ -e "$t/{uid}.err" ] || echo "No logs found yet for pod {uid}."
+        '''
+        with self.runner._session() as c:
+            rc, out, err = self.runner._ssh(c, script)
+        return out if out else err
+
+    def fetch_final_logs(self, uid: str) -> list[tuple[str, bytes]]:
+        pilot = self.pool.lookup(uid)
+        if not pilot:
+            return []
+        script = f'''
+            {self._tasks_dir_expr(pilot)}
+            set --
+            for s in out err; do [ -e "$t/{uid}.$s" ] && set -- "$@" "$t/{uid}.$s"; done
+            [ $# -gt 0 ] || exit 3
+            tar czPf - "$@"
+        '''
+        with self.runner._session() as c:
+            rc, data, err = self.runner._ssh_bytes(c, script)
+        if rc == 3:
+            return []
+        if rc != 0:
+            raise RuntimeError(f"Failed to fetch logs for pilot task {uid}. rc={rc}\nSTDERR:\n{err}")
+        files: list[tuple[str, bytes]] = []
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tf:
+            for m in tf.getmembers():
+                fh = tf.extractfile(m) if m.isfile() else None
+                if fh:
+                    files.append((m.name, fh.read()))
+        return files
+
+    def delete(self, uid: str):
+        pilot = self.pool.lookup(uid)
+        with self.runner._session() as c:
+            if pilot:
+                self.runner._ssh(c, f'{self._tasks_dir_expr(pilot)}; touch "$t/"{shlex.quote(uid + ".cancel")} 2>/dev/null || true')
+            SandboxCache(self.runner).release(c, uid)
+            VolumeStager(self.runner).release(c, uid, posixpath.join(self.runner.target["workdir_base"], uid))
+        self.pool.release(uid)
@@ -1,17 +1,31 @@
 import os, json, tempfile, threading
-from typing import Any
+from typing import Any, Callable
 from state import FileLock
 
 _DEFAULT_PATH = os.environ.get("PLUGIN_STATE_PATH", "/var/lib/interlink-autolauncher-plugin/state.json")
 
+def _status_key(rec: dict | None) -> tuple | None:
+    """The part of a pod record that /watch clients care about."""
+    if rec is None:
+        return None
+    last = rec.get("last_status") or {}
+    return rec.get("status"), rec.get("jid"), last.get("phase"), last.get("reason"), rec.get("submit_error")
+
+
 class PluginState:
-    def __init__(self, path: str = _DEFAULT_PATH):
+    def __init__(self, path: str = _DEFAULT_PATH, on_change: Callable[[str], None] | None = None):
         self.path = path
+        # called with the uid after every status-relevant write (see _status_key)
+        self.on_change = on_change
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
         if not os.path.exists(self.path):
             self._write({"pods":{}})
         self._lock = FileLock(self.path + ".lock")
 
+    def _changed(self, uid: str, old: dict | None, new: dict | None):
+        if self.on_change and _status_key(old) != _status_key(new):
+            self.on_change(uid)
+
     def _read(self) -> dict:
         with open(self.path, "r") as f:
             return json.load(f)
@@ -34,14 +48,51 @@ class PluginState:
             db = self._read()
             return db["pods"].get(uid)
 
+    def all(self) -> dict[str, dict]:
+        with self._lock:
+            return self._read()["pods"]
+
+    def insert(self, uid: str, record: dict[str, Any]) -> bool:
+        """Atomically add uid unless it is already recorded. True if inserted."""
+        with self._lock:
+            db = self._read()
+            if uid in db["pods"]:
+                return False
+            db["pods"][uid] = record
+            self._write(db)
+        self._changed(uid, None, record)
+        return True
+
+    def update(self, uid: str, fn: Callable[[dict], dict | None]) -> dict | None:
+        """
+        Atomic read-modify-write of one record. fn gets a copy of the record and
+        returns the new one, or None to leave it untouched. Returns the stored
+        record, or None if uid is unknown or fn declined.
+        """
+        with self._lock:
+            db = self._read()
+            rec = db["pods"].get(uid)
+            if rec is None:
+                return None
+            new = fn(dict(rec))
+            if new is None:
+                return None
+            db["pods"][uid] = new
+            self._write(db)
+        self._changed(uid, rec, new)
+        return new
+
     def upsert(self, uid: str, record: dict[str, Any]):
         with self._lock:
             db = self._read()
+            old = db["pods"].get(uid)
             db["pods"][uid] = record
             self._write(db)
+        self._changed(uid, old, record)
 
     def remove(self, uid: str):
         with self._lock:
             db = self._read()
-            db["pods"].pop(uid, None)
+            old = db["pods"].pop(uid, None)
             self._write(db)
+        self._changed(uid, old, None)
@@ -1,9 +1,37 @@
 # runner.py
-import os, json, shlex, re, posixpath
+import os, io, json, shlex, re, posixpath, tarfile, time, contextlib, logging
 import yaml
 import paramiko
+from circuit import breaker_for, TargetUnavailable
+from host_pool import stats_for, rank_hosts
+from sandbox_cache import SandboxCache
+from volumes import VolumeStager
 from utils import run, now_rfc3339
 
+# errors that mean "the login node did not answer", as opposed to a command failing
+TRANSPORT_ERRORS = (
+    paramiko.SSHException,
+    paramiko.ssh_exception.NoValidConnectionsError,
+    TimeoutError,
+    ConnectionError,
+    EOFError,
+)
+
+log = logging.getLogger("autolauncher")
+
+_SLURM_PHASES = {
+    "RUNNING": "Running",
+    "PENDING": "Pending",
+    "COMPLETING": "Running",
+    "CONFIGURING": "Pending",
+    "COMPLETED": "Succeeded",
+    "FAILED": "Failed",
+    "CANCELLED": "Failed",
+    "TIMEOUT": "Failed",
+    "PREEMPTED": "Failed",
+    "NODE_FAIL": "Failed",
+}
+
 
 def _parse_bool(v, default=True) -> bool:
     if v is None:
@@ -39,9 +67,17 @@ class LocalRunner:
     def _ensure_name(self, uid: str) -> str:
         return f"auto-{uid[:24].lower()}"
 
-    def launch(self, uid: str, namespace: str, image: str, command: list[str], args: list[str]) -> str:
+    def launch(self, uid: str, namespace: str, image: str, command: list[str], args: list[str],
+               binds: list[str] | None = None) -> str:
         name = self._ensure_name(uid)
-        cmd = ["docker", "run", "-d", "--name", name, image]
+        # idempotent per UID: a container left by an interrupted submission is reused
+        r = run(["docker", "inspect", name, "--format", "{{.Id}}"], check=False)
+        if r.returncode == 0 and r.stdout.strip():
+            return r.stdout.strip()
+        cmd = ["docker", "run", "-d", "--name", name]
+        for b in binds or []:
+            cmd += ["-v", b]
+        cmd.append(image)
         if command:
             cmd.extend(command)
         if args:
@@ -94,6 +130,16 @@ class HPCRunner:
     Auth per-target:
       - SSH key (default): set 'ssh_key' path in targets.yml
       - Password: set 'auth: password', plus 'user_env'/'user' and 'password_env' in targets.yml.
+
+    Login hosts: 'host' (single) or 'hosts' (list). Workdirs live on shared GPFS, so
+    any host of a target will do; each session goes to the healthy host with the
+    lowest observed connect+exec latency and fails over to the next one.
+
+    Deadlines / circuit breaker per login host (all optional, seconds):
+      - connect_timeout (10), command_timeout (60), submit_timeout (180)
+      - breaker_failures (3) consecutive transport failures open the breaker
+        for breaker_reset (30) seconds; once every host of the target is open,
+        calls fail fast with TargetUnavailable.
     """
 
     def __init__(self, target: str = "amd"):
@@ -123,6 +169,17 @@ class HPCRunner:
         if not self.target:
             raise RuntimeError(f"Unknown HPC target '{target}'. Available: {list((cfg.get('targets') or {}).keys())}")
 
+        self.connect_timeout = float(self.target.get("connect_timeout", 10))
+        self.command_timeout = float(self.target.get("command_timeout", 60))
+        self.submit_timeout = float(self.target.get("submit_timeout", 180))
+
+        hosts = self.target.get("hosts") or self.target.get("host") or []
+        self.hosts = [hosts] if isinstance(hosts, str) else list(hosts)
+        if not self.hosts:
+            raise RuntimeError(f"HPC target '{target}' has no 'host' or 'hosts' configured.")
+        # login host of the current session (set by _session)
+        self.host: str | None = None
+
     # ---------- SSH helpers ----------
     def _resolve_user(self) -> str:
         env_key = self.target.get("user_env")
@@ -135,18 +192,27 @@ class HPCRunner:
             raise RuntimeError("No username found. Set 'user' or 'user_env' in targets.yml.")
         return user
 
-    def _connect(self) -> paramiko.SSHClient:
+    def _breaker(self, host: str):
+        return breaker_for(
+            f"{self.target_name}@{host}",
+            failure_threshold=int(self.target.get("breaker_failures", 3)),
+            reset_timeout=float(self.target.get("breaker_reset", 30)),
+        )
+
+    def _connect(self, host: str) -> paramiko.SSHClient:
         c = paramiko.SSHClient()
         c.set_missing_host_key_policy(paramiko.AutoAddPolicy())
 
         user = self._resolve_user()
         auth_mode = (self.target.get("auth") or "ssh-key").lower()
         kwargs = dict(
-            hostname=self.target["host"],
+            hostname=host,
             username=user,
             look_for_keys=False,
             allow_agent=False,
-            timeout=20,
+            timeout=self.connect_timeout,
+            banner_timeout=self.connect_timeout,
+            auth_timeout=self.connect_timeout,
         )
         if auth_mode == "password":
             pw_env = self.target.get("password_env")
@@ -176,13 +242,119 @@ class HPCRunner:
             except IOError:
                 pass
 
-    @staticmethod
-    def _ssh(c: paramiko.SSHClient, cmd: str, cwd: str | None = None) -> tuple[int, str, str]:
+    @contextlib.contextmanager
+    def _session(self):
+        """
+        Connected SSHClient to the fastest healthy login host, guarded by its
+        circuit breaker. Connection failures fail over to the next host; once
+        connected, the operation is not retried elsewhere (submission is not
+        idempotent). Transport errors count as failures; anything else means
+        the node answered. Authentication failures are configuration errors:
+        raised as RuntimeError, without failover.
+        """
+        c = None
+        breaker = None
+        last_exc: Exception | None = None
+        for host in rank_hosts(self.target_name, self.hosts):
+            breaker = self._breaker(host)
+            try:
+                breaker.before_call()
+            except TargetUnavailable as e:
+                last_exc = e
+                continue
+            t0 = time.monotonic()
+            try:
+                c = self._connect(host)
+            except paramiko.AuthenticationException as e:
+                # the host answered; bad credentials would fail on every host (and risk a lockout)
+                breaker.record_success()
+                raise RuntimeError(
+                    f"Authentication to '{host}' of HPC target '{self.target_name}' failed; "
+                    f"check its user / ssh_key / password_env settings."
+                ) from e
+            except (*TRANSPORT_ERRORS, OSError) as e:
+                breaker.record_failure()
+                log.warning("Login host %s of '%s' unreachable: %s", host, self.target_name, e)
+                last_exc = e
+                continue
+            except Exception:
+                breaker.record_success()
+                raise
+            stats_for(self.target_name, host).observe_connect(time.monotonic() - t0)
+            self.host = host
+            break
+        if c is None:
+            raise TargetUnavailable(
+                f"No login host of HPC target '{self.target_name}' is reachable ({', '.join(self.hosts)})."
+            ) from last_exc
+
+        try:
+            yield c
+        except TRANSPORT_ERRORS:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.record_success()
+            raise
+        else:
+            breaker.record_success()
+        finally:
+            c.close()
+            self.host = None
+
+    def _open_sftp(self, c: paramiko.SSHClient) -> paramiko.SFTPClient:
+        sftp = c.open_sftp()
+        # stalled SFTP reads/writes raise socket.timeout instead of hanging
+        sftp.get_channel().settimeout(self.command_timeout)
+        return sftp
+
+    def _exec(self, c: paramiko.SSHClient, cmd: str, timeout: float | None,
+              measure: bool = False) -> tuple[int, bytes, bytes]:
+        """
+        Run cmd and collect its output, giving up (TimeoutError) once the deadline
+        passes. measure=True feeds the wall time into the host's latency average;
+        only set it for short scheduler queries, whose duration reflects the host
+        rather than the work done.
+        """
+        timeout = timeout or self.command_timeout
+        t0 = time.monotonic()
+        deadline = t0 + timeout
+        chan = c.get_transport().open_session(timeout=timeout)
+        try:
+            chan.exec_command(cmd)
+            out: list[bytes] = []
+            err: list[bytes] = []
+            while True:
+                # checked every iteration: a command that keeps streaming output must time out too
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Remote command on '{self.host}' exceeded {timeout:.0f}s deadline")
+                if chan.recv_ready():
+                    out.append(chan.recv(32768))
+                elif chan.recv_stderr_ready():
+                    err.append(chan.recv_stderr(32768))
+                elif chan.exit_status_ready() and (chan.eof_received or chan.closed):
+                    # output precedes EOF on the wire: once EOF is in and both buffers are empty, all of it was read
+                    if not (chan.recv_ready() or chan.recv_stderr_ready()):
+                        break
+                else:
+                    time.sleep(0.05)
+            if measure and self.host:
+                stats_for(self.target_name, self.host).observe_exec(time.monotonic() - t0)
+            return chan.recv_exit_status(), b"".join(out), b"".join(err)
+        finally:
+            chan.close()
+
+    def _ssh(self, c: paramiko.SSHClient, cmd: str, cwd: str | None = None,
+             timeout: float | None = None, measure: bool = False) -> tuple[int, str, str]:
         if cwd:
             cmd = f"cd {shlex.quote(cwd)} && {cmd}"
-        stdin, stdout, stderr = c.exec_command(cmd)
-        rc = stdout.channel.recv_exit_status()
-        return rc, stdout.read().decode(), stderr.read().decode()
+        rc, out, err = self._exec(c, cmd, timeout, measure)
+        return rc, out.decode(errors="replace"), err.decode(errors="replace")
+
+    def _ssh_bytes(self, c: paramiko.SSHClient, cmd: str, timeout: float | None = None) -> tuple[int, bytes, str]:
+        """Like _ssh, but stdout is returned undecoded (binary streams, e.g. tar.gz)."""
+        rc, out, err = self._exec(c, cmd, timeout)
+        return rc, out, err.decode(errors="replace")
 
     # ---------- mapping ----------
     @staticmethod
@@ -199,12 +371,11 @@ class HPCRunner:
 
     # ---------- API ----------
     def launch_hpc(self, uid: str, namespace: str, image: str, command: list[str], args: list[str],
-                   annotations: dict[str, str] | None = None) -> str:
+                   annotations: dict[str, str] | None = None, volumes: list[dict] | None = None) -> str:
         a = annotations or {}
 
+        # explicit sandbox folder; without it the pod image is resolved through the SandboxCache
         container_ref = (a.get("interlink.autolauncher/containerref") or "").strip()
-        if not container_ref:
-            raise RuntimeError("Missing annotation 'interlink.autolauncher/containerref' (container sandbox folder name).")
 
         qos       = a.get("interlink.autolauncher/qos", self.target.get("qos", "debug"))
         account   = a.get("interlink.autolauncher/account", self.target.get("account", None))
@@ -221,10 +392,11 @@ class HPCRunner:
         if account in (None, "",):
             raise RuntimeError("No SLURM account set. Provide 'interlink.autolauncher/account' or set 'account' in the target config.")
 
+        job_name     = f"interlink-{uid}"
         job_dir      = posixpath.join(self.target["workdir_base"], uid)
         config_dir   = posixpath.join(job_dir, "configs")
         output_dir   = posixpath.join(job_dir, "output")
-        containerdir = posixpath.join(self.target["containerdir_base"], container_ref)
+        containerdir = posixpath.join(self.target["containerdir_base"], container_ref) if container_ref else None
 
         binary, cmd_flag, shell_line = self._shell_from_k8s(command, args)
 
@@ -250,6 +422,7 @@ class HPCRunner:
             "add_commit_tag": False,
             "use_code_in_gpfs": use_gpfs,
             "singularity_version": singv,
+            "job_name": job_name,               # lets a retried submission find its job
         }
         # Only AMD launcher consumes 'gres' (as an integer). MN4 ignores it.
         if gres_norm and cluster == "amd":
@@ -257,14 +430,38 @@ class HPCRunner:
         if bindings_list:
             config["bindings_list"] = bindings_list
 
-        c = self._connect()
-        try:
+        # Build env prefix for sbatch
+        env_pairs = []
+        if account:
+            env_pairs.append(f"SBATCH_ACCOUNT={shlex.quote(account)}")
+        if partition:
+            env_pairs.append(f"SBATCH_PARTITION={shlex.quote(partition)}")
+        if qos:
+            env_pairs.append(f"SBATCH_QOS={shlex.quote(qos)}")
+
+        with self._session() as c:
+            existing = self._find_job(c, job_name)
+            if existing:
+                return existing
+
+            if not containerdir:
+                build_env = ("env " + " ".join(env_pairs) + " ") if env_pairs else ""
+                containerdir, build_jid = SandboxCache(self).acquire(c, uid, image, build_env)
+                config["containerdir"] = containerdir
+                if build_jid:
+                    # sandbox still being built: start only once the build job succeeded
+                    env_pairs.append(f"SBATCH_DEPENDENCY=afterok:{shlex.quote(build_jid)}")
+
             mk = f"mkdir -p {shlex.quote(job_dir)} {shlex.quote(config_dir)} {shlex.quote(output_dir)}"
             rc, out, err = self._ssh(c, mk)
             if rc != 0:
                 raise RuntimeError(f"Failed to create job dirs. rc={rc}\nSTDERR:\n{err}\nSTDOUT:\n{out}")
 
-            sftp = c.open_sftp()
+            staged = VolumeStager(self).stage(c, uid, job_dir, volumes or [])
+            if staged:
+                config["bindings_list"] = config.get("bindings_list", []) + staged
+
+            sftp = self._open_sftp(c)
             try:
                 self._sftp_mkdirs(sftp, job_dir)
                 self._sftp_mkdirs(sftp, config_dir)
@@ -279,14 +476,6 @@ class HPCRunner:
             finally:
                 sftp.close()
 
-            # Build env prefix for sbatch
-            env_pairs = []
-            if account:
-                env_pairs.append(f"SBATCH_ACCOUNT={shlex.quote(account)}")
-            if partition:
-                env_pairs.append(f"SBATCH_PARTITION={shlex.quote(partition)}")
-            if qos:
-                env_pairs.append(f"SBATCH_QOS={shlex.quote(qos)}")
             env_prefix = ("env " + " ".join(env_pairs) + " ") if env_pairs else ""
 
             # IMPORTANT: do NOT pass --cluster here; JSON already contains it.
@@ -297,54 +486,91 @@ class HPCRunner:
                 f'--workdir {shlex.quote(job_dir)} '
                 f'--containerdir {shlex.quote(containerdir)}'
             )
-            rc, out, err = self._ssh(c, cmd, cwd=job_dir)
+            rc, out, err = self._ssh(c, cmd, cwd=job_dir, timeout=self.submit_timeout)
             combined = (out or "") + "\n" + (err or "")
             m = re.search(r"Submitted batch job\s+(\d+)", combined)
             if not m:
                 raise RuntimeError(f"Could not parse SLURM JobId. Output:\n{combined}")
             jid = m.group(1).strip()
             return jid
-        finally:
-            c.close()
+
+    def _find_job(self, c: paramiko.SSHClient, job_name: str) -> str | None:
+        """JobId of a job already submitted under job_name (queued or recently finished)."""
+        q = shlex.quote(job_name)
+        rc, out, _ = self._ssh(
+            c, f"{{ squeue -h -n {q} -o %i; sacct -n -X -S now-7days --name {q} -o JobID%20; }} 2>/dev/null || true",
+            measure=True,
+        )
+        for tok in out.split():
+            if tok.isdigit():
+                return tok
+        return None
 
     def status_hpc(self, jid: str) -> dict:
-        c = self._connect()
-        try:
-            rc, out, _ = self._ssh(c, f'squeue -h -j {shlex.quote(jid)} -o "%T" || true')
-            state = (out.strip().splitlines() or [""])[0].upper()
-            if state:
-                phase_map = {
-                    "RUNNING": "Running",
-                    "PENDING": "Pending",
-                    "COMPLETING": "Running",
-                    "CONFIGURING": "Pending",
-                    "COMPLETED": "Succeeded",
-                    "FAILED": "Failed",
-                    "CANCELLED": "Failed",
-                    "TIMEOUT": "Failed",
-                    "PREEMPTED": "Failed",
-                    "NODE_FAIL": "Failed",
-                }
-                phase = phase_map.get(state, "Pending")
-                out = {"phase": phase}
+        with self._session() as c:
+            return self.status_many(c, [jid]).get(jid) or {"phase": "Failed", "reason": "Unknown"}
+
+    def status_many(self, c: paramiko.SSHClient, jids: list[str]) -> dict[str, dict]:
+        """
+        Status of several jobs with one squeue + sacct round trip on session c.
+        Jobs neither listed by squeue nor known to sacct map to Failed/Unknown
+        if squeue answered; if it did not (scheduler busy), they are left out.
+        """
+        if not jids:
+            return {}
+        ids = shlex.quote(",".join(jids))
+        # a single purged id makes squeue fail with "Invalid job id"; that still means "not queued"
+        invalid_ok = "elif echo \"$q\" | grep -qi 'invalid job id'; then echo SQOK; " if len(jids) == 1 else ""
+        rc, out, _ = self._ssh(c, (
+            f'if q=$(squeue -h -j {ids} -o "%i %T %r" 2>&1); then echo "$q" | sed "s/^/SQ /"; echo SQOK; '
+            f"{invalid_ok}fi\n"
+            f"sacct -n -X -j {ids} -o JobID%20,State%20 2>/dev/null | sed 's/^/SA /'; true"
+        ), measure=True)
+        queued: dict[str, tuple[str, str]] = {}
+        accounted: dict[str, str] = {}
+        squeue_ok = False
+        for line in out.splitlines():
+            tag, _, rest = line.strip().partition(" ")
+            parts = rest.split(None, 2)
+            if tag == "SQOK":
+                squeue_ok = True
+            elif tag == "SQ" and len(parts) >= 2:
+                queued[parts[0]] = (parts[1].upper(), parts[2].strip() if len(parts) > 2 else "")
+            elif tag == "SA" and len(parts) >= 2:
+                accounted.setdefault(parts[0], " ".join(parts[1:]).upper())
+
+        result: dict[str, dict] = {}
+        never: list[str] = []
+        for jid in jids:
+            if jid in queued:
+                state, reason = queued[jid]
+                if state == "PENDING" and reason == "DependencyNeverSatisfied":
+                    # its sandbox build (afterok dependency) failed; SLURM would keep it pending forever
+                    never.append(jid)
+                    result[jid] = {"phase": "Failed", "reason": "SandboxBuildFailed"}
+                    continue
+                phase = _SLURM_PHASES.get(state, "Pending")
+                result[jid] = {"phase": phase}
                 if phase == "Running":
-                    out["startedAt"] = now_rfc3339()
-                return out
-
-            rc, out, _ = self._ssh(c, f'sacct -n -j {shlex.quote(jid)} --format=State%20 | head -n1 || true')
-            sacct_state = (out.strip() or "").upper()
-            if "COMPLETED" in sacct_state:
-                return {"phase": "Succeeded"}
-            if sacct_state:
-                return {"phase": "Failed", "reason": sacct_state}
-            return {"phase": "Failed", "reason": "Unknown"}
-        finally:
-            c.close()
+                    result[jid]["startedAt"] = now_rfc3339()
+            elif jid in accounted:
+                sacct_state = accounted[jid]
+                if "COMPLETED" in sacct_state:
+                    result[jid] = {"phase": "Succeeded"}
+                elif _SLURM_PHASES.get(sacct_state.split()[0]) in ("Running", "Pending"):
+                    # still active, squeue just did not answer
+                    result[jid] = {"phase": _SLURM_PHASES[sacct_state.split()[0]]}
+                else:
+                    result[jid] = {"phase": "Failed", "reason": sacct_state}
+            elif squeue_ok:
+                result[jid] = {"phase": "Failed", "reason": "Unknown"}
+        if never:
+            self._ssh(c, f"scancel {' '.join(shlex.quote(j) for j in never)} || true")
+        return result
 
     def logs_hpc(self, jid: str, tail: int | None) -> str:
         n = tail or 200
-        c = self._connect()
-        try:
+        with self._session() as c:
             cmd = f'''
                 set -e
                 f=$(ls -1 {self.target["workdir_base"]}/*/output/*_{shlex.quote(jid)}_out.txt 2>/dev/null | tail -n1) || true
@@ -359,12 +585,51 @@ class HPCRunner:
             '''
             rc, out, err = self._ssh(c, cmd)
             return out if out else err
-        finally:
-            c.close()
 
-    def delete_hpc(self, jid: str):
-        c = self._connect()
-        try:
-            self._ssh(c, f"scancel {shlex.quote(jid)} || true")
-        finally:
-            c.close()
+    def fetch_final_logs(self, jid: str, uid: str) -> list[tuple[str, bytes]]:
+        """
+        Download the complete logs of a terminated job in one gzip'd tar stream.
+        Picks the same files as logs_hpc, except that the slurm_output fallback
+        is looked up only in the pod's own job dir. Returns [(label, content), ...]
+        in display order; label is '' for the slurm_output fallback (no header).
+        """
+        wb = self.target["workdir_base"]
+        job_dir = shlex.quote(posixpath.join(wb, uid))
+        with self._session() as c:
+            cmd = f'''
+                f=$(ls -1 {wb}/*/output/*_{shlex.quote(jid)}_out.txt 2>/dev/null | tail -n1) || true
+                g=$(ls -1 {wb}/*/output/*_{shlex.quote(jid)}_err.txt 2>/dev/null | tail -n1) || true
+                if [ -z "$f" ] && [ -z "$g" ]; then
+                  f=$(ls -1 {job_dir}/slurm_output/* 2>/dev/null | tail -n1) || true
+                fi
+                set --
+                if [ -n "$f" ]; then set -- "$@" "$f"; fi
+                if [ -n "$g" ]; then set -- "$@" "$g"; fi
+                [ $# -gt 0 ] || exit 3
+                tar czPf - "$@"
+            '''
+            rc, data, err = self._ssh_bytes(c, cmd)
+        if rc == 3:
+            return []
+        if rc != 0:
+            raise RuntimeError(f"Failed to fetch logs for job {jid}. rc={rc}\nSTDERR:\n{err}")
+
+        files: list[tuple[str, bytes]] = []
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tf:
+            for m in tf.getmembers():
+                if not m.isfile():
+                    continue
+                fh = tf.extractfile(m)
+                content = fh.read() if fh else b""
+                label = "" if "/slurm_output/" in m.name else m.name
+                files.append((label, content))
+        return files
+
+    def delete_hpc(self, jid: str | None, uid: str | None = None):
+        """Cancel the job (if any) and drop the sandbox and staged-volume references of pod uid."""
+        with self._session() as c:
+            if jid:
+                self._ssh(c, f"scancel {shlex.quote(jid)} || true")
+            if uid:
+                SandboxCache(self).release(c, uid)
+                VolumeStager(self).release(c, uid, posixpath.join(self.target["workdir_base"], uid))
@@ -0,0 +1,179 @@
+import hashlib, logging, posixpath, shlex, threading, time
+from utils import run
+
+log = logging.getLogger("autolauncher")
+
+# tag -> digest lookups are cached briefly; tags are mutable, digests are not
+_DIGEST_TTL = 600.0
+_DIGESTS: dict[str, tuple[float, str]] = {}
+_DIGESTS_LOCK = threading.Lock()
+
+
+def resolve_digest(image: str) -> tuple[str | None, str]:
+    """
+    Map an image reference to (digest, pull_ref).
+      - 'repo@sha256:...'      -> its own digest
+      - tag (skopeo resolved)  -> registry digest, pulled as 'repo@digest'
+      - tag (unresolved)       -> None (tags are mutable, so never a cache key), pulled as-is
+    """
+    if "@sha256:" in image:
+        return image.split("@", 1)[1], image
+    now = time.monotonic()
+    with _DIGESTS_LOCK:
+        hit = _DIGESTS.get(image)
+    if hit and now - hit[0] < _DIGEST_TTL:
+        digest = hit[1]
+    else:
+        digest = ""
+        try:
+            r = run(["skopeo", "inspect", "--format", "{{.Digest}}", f"docker://{image}"], timeout=60)
+            if r.returncode == 0 and r.stdout.strip().startswith("sha256:"):
+                digest = r.stdout.strip()
+        except Exception:
+            pass
+        if digest:
+            with _DIGESTS_LOCK:
+                _DIGESTS[image] = (now, digest)
+    if digest:
+        repo = image.rsplit(":", 1)[0] if ":" in image.rsplit("/", 1)[-1] else image
+        return digest, f"{repo}@{digest}"
+    return None, image
+
+
+class SandboxCache:
+    """
+    Content-addressed Singularity sandboxes on an HPC target.
+
+    Layout under the cache dir (default <containerdir_base>/_cache):
+      sha256-<hex>/         ready sandbox (appears atomically via mv)
+      sha256-<hex>.build/   build lock: SLURM build job id + sandbox being built
+      sha256-<hex>.meta/    size (KiB), last_used (mtime), refs/<pod uid>, build_<jid>.out
+
+    A sandbox is built once per digest by a SLURM job; pods launched while it
+    builds depend on that job (afterok). Sandboxes without refs are evicted
+    least-recently-used first once the cache exceeds its quota. Images whose
+    tag cannot be resolved to a digest (no skopeo, registry unreachable) get a
+    private pod-<hash> sandbox instead, removed again on release.
+
+    The build job pulls from the registry, so compute nodes need registry
+    egress (or sandbox_build_command must fetch from somewhere they can reach).
+    Targets without it set sandbox_cache: false, and pods then have to name a
+    prebuilt sandbox via interlink.autolauncher/containerref.
+
+    Target keys (all optional): sandbox_cache (true), sandbox_cache_dir,
+    sandbox_cache_quota_gb (200), singularity_build ('singularity'),
+    sandbox_build_command ('{singularity} build --sandbox {dest} docker://{ref}'),
+    sandbox_build_time ('01:00:00'), sandbox_build_cpus (4).
+    """
+
+    def __init__(self, runner):
+        t = runner.target
+        self.runner = runner
+        self.base = t.get("sandbox_cache_dir") or posixpath.join(t["containerdir_base"], "_cache")
+        self.quota_kib = int(float(t.get("sandbox_cache_quota_gb", 200)) * 1024 * 1024)
+        self.enabled = str(t.get("sandbox_cache", True)).strip().lower() not in ("0", "false", "no", "off")
+        self.build_cmd = t.get("singularity_build", "singularity")
+        self.build_template = t.get("sandbox_build_command", "{singularity} build --sandbox {dest} docker://{ref}")
+        self.build_time = t.get("sandbox_build_time", "01:00:00")
+        self.build_cpus = int(t.get("sandbox_build_cpus", 4))
+
+    def acquire(self, c, uid: str, image: str, env_prefix: str = "") -> tuple[str, str | None]:
+        """
+        Reference the sandbox for image on behalf of pod uid, starting its build if needed.
+        Returns (absolute sandbox path, build job id to depend on, or None if ready).
+        """
+        if not self.enabled:
+            raise RuntimeError(
+                f"Missing annotation 'interlink.autolauncher/containerref' (container sandbox folder name); "
+                f"target '{self.runner.target_name}' has sandbox_cache disabled."
+            )
+        digest, pull_ref = resolve_digest(image)
+        if digest:
+            key = digest.replace(":", "-")
+        else:
+            key = self._private_key(uid)
+            log.warning("Could not resolve '%s' to a digest; building an uncached sandbox for %s", image, uid)
+        d = posixpath.join(self.base, key)
+        b, m = d + ".build", d + ".meta"
+        qd, qb, qm = shlex.quote(d), shlex.quote(b), shlex.quote(m)
+
+        build = self.build_template.format(
+            singularity=self.build_cmd, dest=f"{qb}/sandbox", ref=shlex.quote(pull_ref),
+        )
+        wrap = (
+            f"{build}"
+            f" && du -sk {qb}/sandbox | cut -f1 > {qm}/size && mv {qb}/sandbox {qd};"
+            f" rc=$?; rm -rf {qb}; exit $rc"
+        )
+        script = f"""
+            mkdir -p {qm}/refs && touch {qm}/refs/{shlex.quote(uid)} {qm}/last_used || exit 1
+            if [ -d {qd} ]; then echo READY; exit 0; fi
+            if mkdir {qb} 2>/dev/null; then
+              jid=$({env_prefix}sbatch --parsable -J {shlex.quote('sandbox-' + key[:19])} -t {shlex.quote(self.build_time)} \\
+                    -n 1 -c {self.build_cpus} -o {qm}/build_%j.out --wrap={shlex.quote(wrap)}) || {{ rm -rf {qb}; exit 1; }}
+              echo "$jid" > {qb}/jid; echo "BUILD $jid"; exit 0
+            fi
+            jid=$(cat {qb}/jid 2>/dev/null)
+            if [ -n "$jid" ] && squeue -h -j "$jid" -o %i 2>/dev/null | grep -q .; then echo "BUILDING $jid"; exit 0; fi
+            if [ -d {qd} ]; then echo READY; exit 0; fi
+            # lock without a live build job (killed build or crashed submitter): clear it after a grace period
+            if [ -z "$(find {qb} -maxdepth 0 -mmin -5 2>/dev/null)" ]; then rm -rf {qb}; fi
+            echo STALE
+        """
+        rc, out, err = self.runner._ssh(c, script)
+        words = (out.strip().splitlines() or [""])[-1].split()
+        if rc != 0 or not words or words[0] == "STALE":
+            raise RuntimeError(f"Could not resolve sandbox for image '{image}' ({key}). rc={rc}\nSTDERR:\n{err}\nSTDOUT:\n{out}")
+        if words[0] == "READY":
+            return d, None
+        build_jid = words[1].split(";")[0]
+        if words[0] == "BUILD":
+            self.evict(c)
+        return d, build_jid
+
+    @staticmethod
+    def _private_key(uid: str) -> str:
+        return "pod-" + hashlib.sha256(uid.encode()).hexdigest()[:24]
+
+    def release(self, c, uid: str):
+        """Drop every reference pod uid holds, and its private sandbox if it had one."""
+        p = shlex.quote(posixpath.join(self.base, self._private_key(uid)))
+        self.runner._ssh(c, (
+            f"rm -f {shlex.quote(self.base)}/*.meta/refs/{shlex.quote(uid)} 2>/dev/null; "
+            f"[ -f {p}.build/jid ] && scancel \"$(cat {p}.build/jid)\" 2>/dev/null; "
+            f"rm -rf {p} {p}.meta {p}.build; true"
+        ))
+
+    def evict(self, c):
+        """Remove unreferenced ready sandboxes, least recently used first, until under quota."""
+        qbase = shlex.quote(self.base)
+        script = f"""
+            cd {qbase} 2>/dev/null || exit 0
+            for d in sha256-*; do
+              case "$d" in *.meta|*.build) continue;; esac
+              [ -d "$d" ] || continue
+              s=$(cat "$d.meta/size" 2>/dev/null || echo 0)
+              r=$(ls -1 "$d.meta/refs" 2>/dev/null | wc -l)
+              t=$(stat -c %Y "$d.meta/last_used" 2>/dev/null || echo 0)
+              echo "$d $s $r $t"
+            done
+        """
+        rc, out, _ = self.runner._ssh(c, script)
+        entries = []
+        for line in out.splitlines():
+            parts = line.split()
+            if len(parts) == 4 and parts[1].isdigit() and parts[2].isdigit() and parts[3].isdigit():
+                entries.append((int(parts[3]), parts[0], int(parts[1]), int(parts[2])))
+        total = sum(e[2] for e in entries)
+        victims = []
+        for _, name, size, refs in sorted(entries):
+            if total <= self.quota_kib:
+                break
+            if refs:
+                continue
+            victims.append(name)
+            total -= size
+        if victims:
+            paths = " ".join(shlex.quote(posixpath.join(self.base, v)) + " " +
+                             shlex.quote(posixpath.join(self.base, v + ".meta")) for v in victims)
+            self.runner._ssh(c, f"rm -rf {paths}")
@@ -1,14 +1,21 @@
-import os, fcntl, time
+import os, fcntl, time, threading
 
 class FileLock:
     def __init__(self, path: str):
         self.path = path
         os.makedirs(os.path.dirname(path), exist_ok=True)
         self.fd = None
+        # flock() only excludes other processes' open files; serialize our own threads too
+        self._thread_lock = threading.Lock()
 
     def __enter__(self):
-        self.fd = open(self.path, "a+")
-        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        self._thread_lock.acquire()
+        try:
+            self.fd = open(self.path, "a+")
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
         return self
 
     def __exit__(self, exc_type, exc, tb):
@@ -17,3 +24,4 @@ class FileLock:
             self.fd.close()
         finally:
             self.fd = None
+            self._thread_lock.release()
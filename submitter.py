@@ -0,0 +1,118 @@
+import os, queue, threading, logging
+from typing import Callable
+from plugin_state import PluginState
+
+log = logging.getLogger("autolauncher")
+
+# pod record states owned by the outbox
+PENDING_SUBMIT = "Pending-Submit"
+SUBMITTING     = "Submitting"
+SUBMIT_FAILED  = "Submit-Failed"
+
+_WORKERS      = int(os.environ.get("PLUGIN_SUBMIT_WORKERS", "4"))
+_MAX_ATTEMPTS = int(os.environ.get("PLUGIN_SUBMIT_MAX_ATTEMPTS", "5"))
+_BACKOFF      = float(os.environ.get("PLUGIN_SUBMIT_BACKOFF", "10"))
+
+
+class Submitter:
+    """
+    Drains the submission outbox: pod records that /create stored in PluginState
+    as Pending-Submit. Each record is claimed (-> Submitting), handed to
+    `submit_fn(uid, record) -> (jid, status)` and then updated with the job id.
+
+    Failures are retried with exponential backoff up to max_attempts, after which
+    the record is left as Submit-Failed. Records found Pending-Submit or
+    Submitting at start-up (i.e. in flight during a restart) are re-queued;
+    submit_fn must be idempotent per UID for that to be safe.
+    """
+
+    def __init__(self, state: PluginState, submit_fn: Callable[[str, dict], tuple[str, str]],
+                 cancel_fn: Callable[[str, dict], None] | None = None,
+                 workers: int = _WORKERS, max_attempts: int = _MAX_ATTEMPTS, backoff: float = _BACKOFF):
+        self.state = state
+        self.submit_fn = submit_fn
+        self.cancel_fn = cancel_fn
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._inflight: set[str] = set()
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"submitter-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        self.recover()
+
+    def recover(self):
+        for uid, rec in self.state.all().items():
+            if rec.get("status") in (PENDING_SUBMIT, SUBMITTING):
+                log.info("Re-queueing submission of %s (%s)", uid, rec.get("status"))
+                self.enqueue(uid)
+
+    def enqueue(self, uid: str):
+        self._queue.put(uid)
+
+    def _worker(self):
+        while True:
+            uid = self._queue.get()
+            with self._lock:
+                if uid in self._inflight:
+                    continue
+                self._inflight.add(uid)
+            try:
+                self._submit_one(uid)
+            except Exception:
+                log.error("Submission worker crashed on %s", uid, exc_info=True)
+            finally:
+                with self._lock:
+                    self._inflight.discard(uid)
+
+    def _submit_one(self, uid: str):
+        def claim(r: dict) -> dict | None:
+            if r.get("status") not in (PENDING_SUBMIT, SUBMITTING):
+                return None
+            r["status"] = SUBMITTING
+            r["attempts"] = int(r.get("attempts", 0)) + 1
+            return r
+
+        rec = self.state.update(uid, claim)
+        if rec is None:
+            return  # deleted, or already submitted
+
+        try:
+            jid, status = self.submit_fn(uid, rec)
+        except Exception as e:
+            self._failed(uid, rec["attempts"], e)
+            return
+
+        def done(r: dict) -> dict:
+            r.pop("submit", None)
+            r.pop("submit_error", None)
+            r["jid"] = jid
+            r["status"] = status
+            return r
+
+        if self.state.update(uid, done) is None and self.cancel_fn:
+            # pod was deleted while we were submitting it
+            log.info("Pod %s deleted during submission; cancelling job %s", uid, jid)
+            self.cancel_fn(uid, {**rec, "jid": jid})
+
+    def _failed(self, uid: str, attempts: int, e: Exception):
+        final = attempts >= self.max_attempts
+        log.warning("Submission of %s failed (attempt %d/%d): %s", uid, attempts, self.max_attempts, e)
+
+        def mark(r: dict) -> dict:
+            r["status"] = SUBMIT_FAILED if final else PENDING_SUBMIT
+            r["submit_error"] = str(e)
+            return r
+
+        if self.state.update(uid, mark) is not None and not final:
+            t = threading.Timer(self.backoff * 2 ** (attempts - 1), self.enqueue, args=(uid,))
+            t.daemon = True
+            t.start()
@@ -0,0 +1,211 @@
+import os, base64, hashlib, logging, posixpath, shlex, shutil, uuid
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger("autolauncher")
+
+_STAGING_DIR = os.environ.get("PLUGIN_STAGING_DIR", "/var/lib/interlink-autolauncher-plugin/staging")
+_UPLOAD_WORKERS = int(os.environ.get("PLUGIN_STAGING_WORKERS", "4"))
+
+
+def staging_dir(uid: str) -> str:
+    return os.path.join(_STAGING_DIR, uid.replace("/", "_"))
+
+
+def _b64(v: str) -> bytes:
+    return base64.b64decode(v)
+
+
+def materialize(uid: str, pod, container_data: list) -> list[dict]:
+    """
+    Write the ConfigMap/Secret/emptyDir volumes mounted by the pod's first
+    container into staging_dir(uid)/<volume>/<key>, using the objects InterLink
+    sent along with the pod. Returns the mounts as
+    [{name, kind, mountPath, subPath, readOnly}]; unsupported volume types are skipped.
+    """
+    spec = pod.spec
+    container = spec.containers[0]
+    mounts = container.volumeMounts or []
+    if not mounts:
+        return []
+    pod_volumes = {v.name: v for v in (spec.volumes or [])}
+    config_maps, secrets = {}, {}
+    for cd in container_data or []:
+        for cm in cd.configMaps or []:
+            config_maps[cm.metadata.name] = cm
+        for sec in cd.secrets or []:
+            secrets[sec.metadata.name] = sec
+
+    root = staging_dir(uid)
+    # written aside and renamed into place, so concurrent /create retries never see a half-written dir
+    tmp = f"{root}.{uuid.uuid4().hex[:8]}.tmp"
+    out = []
+    for m in mounts:
+        vol = pod_volumes.get(m.name)
+        if vol is None:
+            continue
+        files: dict[str, bytes] = {}
+        mode = 0o644
+        kind = "emptyDir"
+        # ConfigMap/Secret mounts are read-only in Kubernetes; on HPC their files are shared blobs too
+        read_only = bool(m.readOnly) or vol.emptyDir is None
+        if vol.configMap is not None:
+            cm = config_maps.get(vol.configMap.name)
+            if cm is None:
+                raise RuntimeError(f"ConfigMap '{vol.configMap.name}' for volume '{m.name}' was not sent with the pod")
+            files.update({k: v.encode() for k, v in (cm.data or {}).items()})
+            files.update({k: _b64(v) for k, v in (cm.binaryData or {}).items()})
+            kind = "configMap"
+        elif vol.secret is not None:
+            sec = secrets.get(vol.secret.secretName)
+            if sec is None:
+                raise RuntimeError(f"Secret '{vol.secret.secretName}' for volume '{m.name}' was not sent with the pod")
+            files.update({k: _b64(v) for k, v in (sec.data or {}).items()})
+            files.update({k: v.encode() for k, v in (sec.stringData or {}).items()})
+            mode = 0o600
+            kind = "secret"
+        elif vol.emptyDir is None:
+            log.warning("Volume '%s' of pod %s has an unsupported type; not staged", m.name, uid)
+            continue
+
+        vdir = os.path.join(tmp, m.name)
+        os.makedirs(vdir, exist_ok=True)
+        for key, data in files.items():
+            path = os.path.join(vdir, key)
+            with open(path, "wb") as f:
+                f.write(data)
+            os.chmod(path, mode)
+        out.append({"name": m.name, "kind": kind, "mountPath": m.mountPath, "subPath": m.subPath or "",
+                    "readOnly": read_only})
+    if out:
+        try:
+            os.rename(tmp, root)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)   # already staged by an earlier /create
+    return out
+
+
+def docker_binds(uid: str, volumes: list[dict]) -> list[str]:
+    """'-v' arguments for LocalRunner."""
+    root = staging_dir(uid)
+    binds = []
+    for v in volumes:
+        src = os.path.join(root, v["name"], v["subPath"]) if v["subPath"] else os.path.join(root, v["name"])
+        binds.append(f"{src}:{v['mountPath']}" + (":ro" if v["readOnly"] else ""))
+    return binds
+
+
+def cleanup(uid: str):
+    shutil.rmtree(staging_dir(uid), ignore_errors=True)
+
+
+class VolumeStager:
+    """
+    Copies staged pod volumes into <job_dir>/volumes on an HPC target.
+
+    Files are content-addressed in <workdir_base>/_blobs/<sha256>: blobs already
+    on the target are only hard-linked (symlinked across filesets) into the job
+    dir, the rest are uploaded first, in parallel, over pipelined SFTP channels.
+    Each blob has a <sha256>.refs/<pod uid> entry per pod using it; release()
+    drops a pod's refs and removes blobs nobody references any more.
+
+    Secret files never go to the shared blob store: they are uploaded straight
+    into the job dir (mode 600) and removed with it on release().
+    """
+
+    def __init__(self, runner, workers: int = _UPLOAD_WORKERS):
+        self.runner = runner
+        self.workers = workers
+        self.blobs = posixpath.join(runner.target["workdir_base"], "_blobs")
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def stage(self, c, uid: str, job_dir: str, volumes: list[dict]) -> list[str]:
+        """Stage volumes for uid; returns singularity binds 'src:dst[:ro]'."""
+        if not volumes:
+            return []
+        root = staging_dir(uid)
+        vol_root = posixpath.join(job_dir, "volumes")
+
+        files: list[tuple[str, str, str]] = []          # (local path, remote path, sha256)
+        private: list[tuple[str, str]] = []             # (local path, remote path) of Secret files
+        dirs = {posixpath.join(vol_root, v["name"]) for v in volumes}
+        for v in volumes:
+            local = os.path.join(root, v["name"])
+            for dirpath, _, names in os.walk(local):
+                rel = os.path.relpath(dirpath, local)
+                rdir = posixpath.join(vol_root, v["name"], *([] if rel == "." else rel.split(os.sep)))
+                dirs.add(rdir)
+                for n in names:
+                    p = os.path.join(dirpath, n)
+                    if v.get("kind") == "secret":
+                        private.append((p, posixpath.join(rdir, n)))
+                    else:
+                        files.append((p, posixpath.join(rdir, n), self._sha256(p)))
+
+        hashes = sorted({h for _, _, h in files})
+        qblobs, u = shlex.quote(self.blobs), shlex.quote(uid)
+        # refs are taken before checking presence, so a concurrent release() keeps these blobs
+        script = (
+            f"mkdir -p {qblobs} " + " ".join(shlex.quote(d) for d in sorted(dirs)) + " || exit 1\n"
+            f"for h in {' '.join(hashes)}; do mkdir -p {qblobs}/$h.refs && touch {qblobs}/$h.refs/{u} || exit 1; "
+            f"[ -e {qblobs}/$h ] && echo $h; done; true"
+        )
+        rc, out, err = self.runner._ssh(c, script)
+        if rc != 0:
+            raise RuntimeError(f"Failed to prepare volume dirs. rc={rc}\nSTDERR:\n{err}")
+        present = set(out.split())
+        missing = {posixpath.join(self.blobs, h): p for p, _, h in files if h not in present}
+        if missing:
+            log.info("Staging %s: uploading %d of %d blobs", uid, len(missing), len(hashes))
+        self._upload(c, missing | {r: p for p, r in private})
+
+        links = "\n".join(
+            f"ln -f {qblobs}/{h} {shlex.quote(r)} 2>/dev/null || ln -sf {qblobs}/{h} {shlex.quote(r)} || exit 1"
+            for _, r, h in files
+        )
+        if links:
+            rc, out, err = self.runner._ssh(c, links)
+            if rc != 0:
+                raise RuntimeError(f"Failed to link staged volumes. rc={rc}\nSTDERR:\n{err}")
+
+        binds = []
+        for v in volumes:
+            src = posixpath.join(vol_root, v["name"], v["subPath"]) if v["subPath"] else posixpath.join(vol_root, v["name"])
+            binds.append(f"{src}:{v['mountPath']}" + (":ro" if v["readOnly"] else ""))
+        return binds
+
+    def release(self, c, uid: str, job_dir: str):
+        """Remove the job's staged volumes, drop uid's blob refs and delete unreferenced blobs."""
+        qblobs, u = shlex.quote(self.blobs), shlex.quote(uid)
+        self.runner._ssh(c, (
+            f"rm -rf {shlex.quote(posixpath.join(job_dir, 'volumes'))}\n"
+            f"cd {qblobs} 2>/dev/null || exit 0\n"
+            f"rm -f ./*.refs/{u}\n"
+            f'for r in ./*.refs; do [ -d "$r" ] || continue; rmdir "$r" 2>/dev/null && rm -f "${{r%.refs}}"; done; true'
+        ))
+
+    def _upload(self, c, uploads: dict[str, str]):
+        """Upload {remote path: local path}, each written aside and renamed into place."""
+        def put(item: tuple[str, str]):
+            remote, local = item
+            # one SFTP channel per upload so transfers overlap; putfo pipelines writes
+            sftp = self.runner._open_sftp(c)
+            try:
+                tmp = posixpath.join(posixpath.dirname(remote), f".{posixpath.basename(remote)}.{uuid.uuid4().hex[:8]}.tmp")
+                with open(local, "rb") as f:
+                    sftp.putfo(f, tmp)
+                sftp.chmod(tmp, 0o600)
+                sftp.posix_rename(tmp, remote)
+            finally:
+                sftp.close()
+
+        if not uploads:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            list(pool.map(put, uploads.items()))